@@ -0,0 +1,16 @@
+"""Validation of Audit Sight templates.
+
+The validation engine pulls in pandas and openpyxl, so it is only imported the
+first time ``validate`` or ``ValidationResult`` is used.
+"""
+
+__all__ = ["validate", "ValidationResult", "Instrumentation", "ValidationCancelled"]
+
+def __getattr__(name):
+    if name in ("validate", "ValidationResult"):
+        from . import runner
+        return getattr(runner, name)
+    if name in ("Instrumentation", "ValidationCancelled"):
+        from . import profiling
+        return getattr(profiling, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
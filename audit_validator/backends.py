@@ -0,0 +1,171 @@
+"""Reader backends that load the template's tabs into the frames every check expects.
+
+An xlsx backend yields each sheet's rows as tuples of cell values, which ingest lays out into
+frames, so the frames are identical whichever backend read them. A tab can also be supplied
+as its own CSV, Parquet or Feather file, such as a journal export too large for the template;
+those files hold the tab's header row and lines, with or without the template's description row.
+"""
+import datetime
+import importlib.util
+import os
+from contextlib import contextmanager
+
+import openpyxl
+import pandas as pd
+
+from .ingest import frame_from_rows
+from .schema import AMOUNT_COLUMNS, DATE_COLUMNS, TEXT_COLUMNS, to_dates
+
+TABLE_WIDTH = 7
+
+TAB_FILE_EXTENSIONS = (".csv", ".parquet", ".feather")
+
+def calamine_installed():
+    return importlib.util.find_spec("python_calamine") is not None
+
+@contextmanager
+def openpyxl_sheets(input_file_path):
+    """Stream sheet rows with openpyxl in read-only mode."""
+    workbook = openpyxl.load_workbook(input_file_path, read_only=True, data_only=True)
+
+    def rows(sheet_name):
+        sheet = workbook[sheet_name]
+        # Read-only sheets stop at the size in the sheet's <dimension> tag, which some writers
+        # leave stale; without it every row is read.
+        sheet.reset_dimensions()
+        return sheet.iter_rows(values_only=True)
+
+    try:
+        yield rows
+    finally:
+        workbook.close()
+
+def calamine_value(value):
+    """Convert a python-calamine cell value to the one openpyxl reads for the same cell."""
+    if isinstance(value, str):
+        return value if value else None
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if type(value) is datetime.date:
+        return datetime.datetime.combine(value, datetime.time())
+    return value
+
+@contextmanager
+def calamine_sheets(input_file_path):
+    """Read sheet rows with the Rust calamine parser, anchored at A1 like openpyxl's."""
+    from python_calamine import CalamineWorkbook
+
+    workbook = CalamineWorkbook.from_path(input_file_path)
+
+    def rows(sheet_name):
+        sheet = workbook.get_sheet_by_name(sheet_name)
+        start = sheet.start or (0, 0)
+        for _ in range(start[0]):
+            yield ()
+        leading = (None,) * start[1]
+        for row in sheet.iter_rows():
+            yield leading + tuple(calamine_value(value) for value in row)
+
+    try:
+        yield rows
+    finally:
+        workbook.close()
+
+XLSX_BACKENDS = {
+    "openpyxl": openpyxl_sheets,
+    "calamine": calamine_sheets,
+}
+
+def xlsx_backend(name=None):
+    """Resolve a backend name; "auto" or None picks calamine when it is installed, else openpyxl."""
+    if name in (None, "auto"):
+        return "calamine" if calamine_installed() else "openpyxl"
+    if name not in XLSX_BACKENDS:
+        raise ValueError(f"Unknown reader backend {name!r}; choose from auto, {', '.join(XLSX_BACKENDS)}")
+    if name == "calamine" and not calamine_installed():
+        raise ImportError("The calamine reader needs the python-calamine package")
+    return name
+
+def is_description_row(values, sheet_name):
+    """The template's description row has text, not numbers, in the tab's amount columns."""
+    for column in AMOUNT_COLUMNS.get(sheet_name, ()):
+        value = values[column] if column < len(values) else None
+        if isinstance(value, str) and value.strip() and pd.isna(pd.to_numeric(value.replace(",", ""), errors="coerce")):
+            return True
+    return False
+
+def read_csv_tab(path, sheet_name):
+    columns = list(pd.read_csv(path, nrows=0).columns)
+    first = pd.read_csv(path, nrows=1, dtype=str, keep_default_na=False)
+    description = None
+    if len(first) and is_description_row(list(first.iloc[0]), sheet_name):
+        description = [value or None for value in first.iloc[0]]
+
+    if sheet_name in TEXT_COLUMNS:
+        dtype = {columns[column]: str for column in TEXT_COLUMNS[sheet_name] if column < len(columns)}
+    else:
+        dtype = str
+    df = pd.read_csv(path, dtype=dtype, skiprows=[1] if description else None, thousands=",")
+    return df, description
+
+def read_tab_file(path, sheet_name):
+    """Load one tab from a CSV, Parquet or Feather file into the frame its xlsx sheet would give."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        df, description = read_csv_tab(path, sheet_name)
+    elif extension == ".parquet":
+        df, description = pd.read_parquet(path), None
+    elif extension == ".feather":
+        df, description = pd.read_feather(path), None
+    else:
+        raise ValueError(f"Unsupported file type for {sheet_name!r}: {path} (use {', '.join(TAB_FILE_EXTENSIONS)})")
+
+    if sheet_name not in TEXT_COLUMNS:
+        return trimmed_frame(df)
+    if description is None and len(df) and is_description_row(list(df.iloc[0]), sheet_name):
+        description = list(df.iloc[0])
+        df = df.iloc[1:]
+    return table_tab_frame(df, sheet_name, description)
+
+def table_tab_frame(df, sheet_name, description=None):
+    """Lay out a table tab the way table_frame lays out its sheet.
+
+    Only columns A:G and the lines above the first blank ID in column A are kept, and a blank
+    row 0 stands in for the description row. The description itself, when the file had one,
+    goes to attrs["description"] as compact_frame would put it, so the typed columns are
+    never widened to hold its text.
+    """
+    header = list(df.columns[:TABLE_WIDTH]) + [None] * (TABLE_WIDTH - min(len(df.columns), TABLE_WIDTH))
+    df = df.iloc[:, :TABLE_WIDTH].copy()
+    for column in range(df.shape[1], TABLE_WIDTH):
+        df[f"Unnamed: {column}"] = None
+
+    blank = df.iloc[:, 0].isna().to_numpy()
+    if blank.any():
+        df = df.iloc[:blank.argmax()]
+
+    for column in DATE_COLUMNS.get(sheet_name, ()):
+        values = df.iloc[:, column]
+        if not pd.api.types.is_datetime64_any_dtype(values):
+            # Dates only become datetimes when all of them parse; compact_frame keeps the rest.
+            parsed = to_dates(values)
+            if parsed.notna().sum() == values.notna().sum():
+                df.isetitem(column, parsed)
+
+    df = df.set_axis(frame_from_rows(header, []).columns, axis=1).reset_index(drop=True)
+    df.index += 1
+    df = df.reindex(range(len(df) + 1))
+    if description is not None:
+        description = list(description[:TABLE_WIDTH]) + [None] * (TABLE_WIDTH - len(description))
+        df.attrs["description"] = tuple(None if pd.isna(value) else value for value in description)
+    return df
+
+def trimmed_frame(df):
+    """Drop trailing empty rows and columns, as sheet_frame does for a whole sheet."""
+    used_rows = df.notna().any(axis=1).to_numpy()
+    named = ~df.columns.astype(str).str.startswith("Unnamed: ")
+    used_columns = df.notna().any(axis=0).to_numpy() | named
+    rows = used_rows.nonzero()[0]
+    columns = used_columns.nonzero()[0]
+    df = df.iloc[:rows[-1] + 1 if len(rows) else 0, :columns[-1] + 1 if len(columns) else 0]
+    return df.reset_index(drop=True)
@@ -0,0 +1,144 @@
+import csv
+import glob
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .cache import ResultCache
+from .duplicates import DEFAULT_WINDOW_DAYS
+from .runner import validate
+
+SUMMARY_FIELDS = [
+    "input_path",
+    "output_path",
+    "je_list_path",
+    "passed",
+    "balance_check",
+    "invalid_mapping_count",
+    "debit_credit_check",
+    "journal_entry_check",
+    "duplicate_check",
+    "duplicate_line_count",
+    "roll_forward_check",
+    "roll_forward_exception_count",
+    "missing_account_count",
+    "unparsed_value_count",
+    "error",
+]
+
+def collect_inputs(paths):
+    """Expand files, directories and glob patterns into a sorted, de-duplicated list of templates.
+
+    Directories contribute the .xlsx files directly inside them; Excel lock files (~$...) are skipped.
+    """
+    inputs = []
+    for path in paths:
+        if os.path.isdir(path):
+            matches = glob.glob(os.path.join(path, "*.xlsx"))
+        elif glob.has_magic(path):
+            matches = glob.glob(path, recursive=True)
+        else:
+            matches = [path]
+        inputs.extend(match for match in matches if not os.path.basename(match).startswith("~$"))
+    return sorted(set(os.path.abspath(path) for path in inputs))
+
+def output_directories(inputs, output_root):
+    """Give every input its own output directory under output_root, named after the file."""
+    directories = []
+    used = set()
+    for input_path in inputs:
+        stem = os.path.splitext(os.path.basename(input_path))[0]
+        name = stem
+        suffix = 1
+        while name in used:
+            suffix += 1
+            name = f"{stem}-{suffix}"
+        used.add(name)
+        directories.append(os.path.join(output_root, name))
+    return directories
+
+def error_summary(input_path, error):
+    """Summary row of a template that could not be validated."""
+    summary = dict.fromkeys(SUMMARY_FIELDS, "")
+    summary.update(input_path=input_path, passed=False, error=error)
+    return summary
+
+def validate_to_summary(input_path, output_dir, cache_dir=None, backend=None, duplicate_window_days=DEFAULT_WINDOW_DAYS):
+    """Validate one template in a worker process and reduce the result to a summary row."""
+    try:
+        cache = None if cache_dir is None else ResultCache(cache_dir)
+        result = validate(
+            input_path, output_dir, cache=cache, backend=backend, duplicate_window_days=duplicate_window_days,
+        )
+    except Exception as e:
+        return error_summary(input_path, str(e))
+
+    return {
+        "input_path": input_path,
+        "output_path": result.output_path,
+        "je_list_path": result.je_list_path,
+        "passed": result.passed,
+        "balance_check": result.balance_check,
+        "invalid_mapping_count": len(result.invalid_mappings),
+        "debit_credit_check": result.debit_credit_check,
+        "journal_entry_check": result.journal_entry_check,
+        "duplicate_check": result.duplicate_check,
+        "duplicate_line_count": len({entry[0] for entry in result.duplicate_lines}),
+        "roll_forward_check": result.roll_forward_check,
+        "roll_forward_exception_count": len(result.roll_forward_exceptions),
+        "missing_account_count": len(result.missing_account_ids),
+        "unparsed_value_count": len(result.unparsed_values),
+        "error": "",
+    }
+
+def validate_batch(inputs, output_root, max_workers=None, cache_dir=None, backend=None,
+                   duplicate_window_days=DEFAULT_WINDOW_DAYS):
+    """Validate many templates across a process pool, returning one summary row per input in input order.
+
+    When cache_dir is given every worker shares the ResultCache stored there. backend names the
+    xlsx reader every worker uses, and duplicate_window_days the near-duplicate date window.
+    """
+    directories = output_directories(inputs, output_root)
+    jobs = [
+        (input_path, directory, cache_dir, backend, duplicate_window_days)
+        for input_path, directory in zip(inputs, directories)
+    ]
+    summaries = [None] * len(jobs)
+    broken = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(validate_to_summary, *job) for job in jobs]
+        for index, future in enumerate(futures):
+            try:
+                summaries[index] = future.result()
+            except BrokenProcessPool:
+                # A worker process died, e.g. out of memory, failing every template left on the pool.
+                broken.append(index)
+
+    # Each template the broken pool took down runs again in a pool of its own, so only the one
+    # that kills its worker fails.
+    if broken:
+        with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as threads:
+            for index, summary in zip(broken, threads.map(isolated_summary, [jobs[index] for index in broken])):
+                summaries[index] = summary
+    return summaries
+
+def isolated_summary(job):
+    """validate_to_summary in a worker process of its own, with a worker that dies as an error row."""
+    try:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            return executor.submit(validate_to_summary, *job).result()
+    except BrokenProcessPool as e:
+        return error_summary(job[0], f"Worker process died: {e}")
+
+def write_summary(summaries, summary_path):
+    """Write the batch summary as JSON when summary_path ends in .json, otherwise as CSV."""
+    if summary_path.lower().endswith(".json"):
+        with open(summary_path, "w", encoding="utf-8") as f:
+            json.dump(summaries, f, ensure_ascii=False, indent=2)
+        return
+
+    with open(summary_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        writer.writerows(summaries)
@@ -0,0 +1,138 @@
+import hashlib
+import os
+import pickle
+import posixpath
+import re
+import tempfile
+import zipfile
+import xml.etree.ElementTree as ET
+
+import pandas as pd
+
+# Bump when ingestion or a check changes what it produces, so stale entries are never reused.
+CACHE_VERSION = "5"
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+SPREADSHEET_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+RELATIONSHIP_ID = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+PACKAGE_RELS_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+# Raw XML of each shared string, and the shared string index in each shared string cell, with or
+# without a namespace prefix.
+SHARED_STRING_ITEM = re.compile(rb"<(?:\w+:)?si\b.*?</(?:\w+:)?si>|<(?:\w+:)?si\s*/>", re.DOTALL)
+SHARED_STRING_CELL = re.compile(rb'<(?:\w+:)?c\b[^>]*?\bt="s"[^>]*>\s*<(?:\w+:)?v>\s*(\d+)\s*<')
+
+def default_cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "audit-validator")
+
+def cache_key(*parts):
+    digest = hashlib.sha256(CACHE_VERSION.encode())
+    for part in parts:
+        digest.update(b"\0" + str(part).encode())
+    return digest.hexdigest()
+
+def frame_digest(df):
+    """Content hash of a DataFrame's column names, attrs and values, independent of its index."""
+    digest = hashlib.sha256()
+    digest.update(repr(list(df.columns)).encode())
+    digest.update(repr(sorted(df.attrs.items())).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def series_digest(values):
+    """Content hash of a Series' index and the text of its values."""
+    return hashlib.sha256(pd.util.hash_pandas_object(values.astype(str)).to_numpy().tobytes()).hexdigest()
+
+def sheet_digests(input_file_path, sheet_names):
+    """Hash the raw XML behind each named sheet of an xlsx file without parsing any cells.
+
+    Text cells hold an index into the shared strings part, so each sheet's digest folds in the
+    shared strings that sheet refers to, and an edit to another sheet's text leaves it unchanged.
+    Date detection depends on the styles part, which is folded into every digest.
+    """
+    with zipfile.ZipFile(input_file_path) as archive:
+        workbook = ET.fromstring(archive.read("xl/workbook.xml"))
+        rels = ET.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+        targets = {rel.get("Id"): rel.get("Target") for rel in rels.iter(f"{PACKAGE_RELS_NS}Relationship")}
+
+        names = set(archive.namelist())
+        styles = hashlib.sha256()
+        if "xl/styles.xml" in names:
+            styles.update(archive.read("xl/styles.xml"))
+        shared_strings = []
+        if "xl/sharedStrings.xml" in names:
+            shared_strings = SHARED_STRING_ITEM.findall(archive.read("xl/sharedStrings.xml"))
+
+        digests = {}
+        for sheet in workbook.iter(f"{SPREADSHEET_NS}sheet"):
+            name = sheet.get("name")
+            if name not in sheet_names:
+                continue
+            target = targets[sheet.get(RELATIONSHIP_ID)]
+            part = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+            sheet_xml = archive.read(part)
+            digest = styles.copy()
+            digest.update(sheet_xml)
+            for index in sorted({int(index) for index in SHARED_STRING_CELL.findall(sheet_xml)}):
+                digest.update(b"\0%d\0" % index)
+                if index < len(shared_strings):
+                    digest.update(shared_strings[index])
+            digests[name] = digest.hexdigest()
+    return digests
+
+class ResultCache:
+    """On-disk cache of pickled DataFrames and check results, evicting least recently used entries past max_bytes."""
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".pkl")
+
+    def get(self, key):
+        """Return the cached value for key, or None when it is not cached."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def put(self, key, value):
+        # Write to a temporary file first so concurrent validations never read a partial entry.
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self._path(key))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pkl"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            total -= size
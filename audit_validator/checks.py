@@ -0,0 +1,97 @@
+import os
+
+import numpy as np
+import openpyxl
+from openpyxl.styles import NamedStyle
+from openpyxl.utils import get_column_letter
+
+from .journals import journal_balances, journal_lines, journal_report
+from .mapping import mapping_index
+from .schema import as_text
+from .writer import ACCOUNTING_FORMAT, column_widths, frame_rows, styled_cell
+
+def validate_comparative_trial_balances(context):
+    """Check each trial balance row's Account Type and Account Mapping against the Mapping Categories tab."""
+    accounts = context.df_ctb.iloc[1:, [4, 5]]
+    accounts = accounts[accounts.notna().any(axis=1)]
+    categories = as_text(accounts.iloc[:, 0], strip=True).astype(object).fillna("")
+    values = as_text(accounts.iloc[:, 1], strip=True).astype(object).fillna("")
+
+    invalid_category, invalid_value = mapping_index(context.df_mapping).invalid_rows(categories, values)
+    flagged = invalid_category | invalid_value
+    rows = accounts.index.to_numpy()[flagged] + 2
+
+    invalid_entries = []
+    for row, category, value, bad_category in zip(
+        rows.tolist(), categories[flagged], values[flagged], invalid_category[flagged]
+    ):
+        if bad_category:
+            invalid_entries.append((row, category))
+            context.highlight("Comparative Trial Balances", row, [5, 6])
+        else:
+            invalid_entries.append((row, category, value))
+            context.highlight("Comparative Trial Balances", row, [6])
+
+    return invalid_entries
+
+def check_balance_sums(ctb_df):
+    """Check that both period balances, in exact cents, sum to zero."""
+    sum_c = ctb_df.iloc[1:, 2].sum()
+    sum_d = ctb_df.iloc[1:, 3].sum()
+    if sum_c != 0:
+        return "Prior Period Balance does not sum to 0."
+    if sum_d != 0:
+        return "Current Period Balance does not sum to 0."
+    return "Prior Period Balance and Current Period Balance both sum to 0. ✅"
+
+def process_journal_entries(df):
+    """Net each line's Debit against its Credit so that at most one side is non-zero."""
+    lines = journal_lines(df)
+    net_value = (lines["debit"] - lines["credit"]).to_numpy()
+
+    df.iloc[1:, 5] = np.where(net_value > 0, net_value, 0)
+    df.iloc[1:, 6] = np.where(net_value < 0, -net_value, 0)
+
+def check_debit_credit_sums(df):
+    lines = journal_lines(df)
+    sum_f = lines["debit"].sum()
+    sum_g = lines["credit"].sum()
+
+    sum_f_str = f"${sum_f / 100:,.2f}"
+    sum_g_str = f"${sum_g / 100:,.2f}"
+
+    if sum_f == sum_g:
+        return f"The sums of the Debit and Credit columns are equal. Both are {sum_f_str}. ✅"
+    else:
+        return f"The sums of the Debit and Credit columns are not equal. The Debit column sums to {sum_f_str} while the Credit column sums to {sum_g_str}. ❌"
+
+def summarize_journal_entries(df):
+    """Net balance and date range of every journal, and whether all of them balance on a single date."""
+    return journal_report(journal_balances(df).accumulators())
+
+def write_je_list(je_frame, output_directory):
+    """Stream je_list.xlsx from the report frame, Net Balance in accounting format."""
+    je_list_path = os.path.join(output_directory, 'je_list.xlsx')
+    je_workbook = openpyxl.Workbook(write_only=True)
+    je_workbook.add_named_style(NamedStyle(name="accounting_style_je", number_format=ACCOUNTING_FORMAT))
+    je_sheet = je_workbook.create_sheet("Journal Entries")
+
+    for column, width in enumerate(column_widths(je_frame), start=1):
+        je_sheet.column_dimensions[get_column_letter(column)].width = width
+    je_sheet.append(list(je_frame.columns))
+    for row in frame_rows(je_frame):
+        row = list(row)
+        row[1] = styled_cell(je_sheet, row[1], style="accounting_style_je")
+        je_sheet.append(row)
+    je_workbook.save(je_list_path)
+
+def journal_entry_balance_message(all_balanced):
+    if all_balanced:
+        return "All journal entries balance. ✅"
+    else:
+        return "There are unbalanced journal entries. See 'je_list.xlsx' ❌"
+
+def check_journal_entry_balances(df, output_directory):
+    je_frame, all_balanced = summarize_journal_entries(df)
+    write_je_list(je_frame, output_directory)
+    return journal_entry_balance_message(all_balanced)
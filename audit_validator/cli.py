@@ -0,0 +1,151 @@
+import argparse
+import contextlib
+import glob
+import json
+import os
+import sys
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, not {value}")
+    return number
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="audit-validate",
+        description="Validate Audit Sight templates and write output_file.xlsx and je_list.xlsx for each.",
+    )
+    parser.add_argument(
+        "inputs", nargs="+", metavar="input",
+        help="template (.xlsx), directory of templates, or glob pattern; more than one file runs a batch",
+    )
+    parser.add_argument("-o", "--output-dir", default=".", help="directory for the output files (default: current directory)")
+    parser.add_argument("--json", action="store_true", help="print the result as JSON instead of the validation log")
+    parser.add_argument(
+        "--cache", nargs="?", const="", default=None, metavar="DIR",
+        help="reuse parsed sheets and check results from earlier runs, stored in DIR "
+             "(default: ~/.cache/audit-validator)",
+    )
+    parser.add_argument(
+        "--reader", choices=["auto", "openpyxl", "calamine"], default="auto",
+        help="xlsx reader: calamine (needs python-calamine) or openpyxl (default: calamine when installed)",
+    )
+    tabs = parser.add_argument_group(
+        "tab files",
+        "read a tab from a CSV, Parquet or Feather file instead of the template (single-file runs only)",
+    )
+    tabs.add_argument("--trial-balance", metavar="PATH", help="Comparative Trial Balances tab")
+    tabs.add_argument("--journal", metavar="PATH", help="Journal Entries & Lines tab")
+    tabs.add_argument("--mapping", metavar="PATH", help="Mapping Categories tab")
+    parser.add_argument(
+        "--duplicate-window", type=int, default=3, metavar="DAYS",
+        help="flag lines posting the same account and amount within DAYS days as near-duplicates "
+             "(default: 3; 0 flags exact duplicates only)",
+    )
+    parser.add_argument("--timings", action="store_true", help="print each stage's time, rows/s and peak memory to stderr")
+    parser.add_argument("--trace", metavar="PATH", help="write stage timings as a Chrome trace (chrome://tracing, Perfetto)")
+    parser.add_argument(
+        "--profile", metavar="PREFIX",
+        help="profile the run with cProfile and tracemalloc, writing PREFIX.prof and PREFIX-hotspots.txt",
+    )
+    parser.add_argument("-j", "--jobs", type=positive_int, default=None, help="worker processes for a batch (default: one per CPU)")
+    parser.add_argument(
+        "--summary", default=None,
+        help="batch summary file, CSV or .json (default: summary.csv in the output directory)",
+    )
+    return parser
+
+def is_single_file(inputs):
+    return len(inputs) == 1 and not os.path.isdir(inputs[0]) and not glob.has_magic(inputs[0])
+
+def tab_files(args):
+    tabs = {
+        "Comparative Trial Balances": args.trial_balance,
+        "Journal Entries & Lines": args.journal,
+        "Mapping Categories": args.mapping,
+    }
+    return {sheet_name: path for sheet_name, path in tabs.items() if path}
+
+def print_stage(record):
+    """Print a finished stage's timing to stderr, for --timings."""
+    from .profiling import format_stage
+
+    print(format_stage(record), file=sys.stderr)
+
+def run_single(args):
+    # Imported here so that --help and argument errors never pay for pandas and openpyxl.
+    from .cache import ResultCache
+    from .profiling import Instrumentation, profiled
+    from .runner import validate
+
+    instrumentation = Instrumentation(on_stage=print_stage if args.timings else None)
+
+    try:
+        cache = None if args.cache is None else ResultCache(args.cache or None)
+        with profiled(args.profile) if args.profile else contextlib.nullcontext():
+            result = validate(
+                args.inputs[0], args.output_dir, cache=cache, instrumentation=instrumentation,
+                backend=args.reader, tab_files=tab_files(args), duplicate_window_days=args.duplicate_window,
+            )
+    except Exception as e:
+        print(f"audit-validate: could not validate {args.inputs[0]}: {e}", file=sys.stderr)
+        return 2
+
+    if args.trace:
+        instrumentation.write_chrome_trace(args.trace)
+
+    if args.json:
+        json.dump(result.to_dict(), sys.stdout, ensure_ascii=False, indent=2)
+        sys.stdout.write("\n")
+    else:
+        for line in result.log:
+            print(line)
+    return 0 if result.passed else 1
+
+def run_batch(args):
+    from .batch import collect_inputs, validate_batch, write_summary
+
+    if args.trace or args.profile or tab_files(args):
+        print(
+            "audit-validate: --trace, --profile and tab files apply to single-file runs only",
+            file=sys.stderr,
+        )
+        return 2
+
+    inputs = collect_inputs(args.inputs)
+    if not inputs:
+        print("audit-validate: no templates matched the given inputs", file=sys.stderr)
+        return 2
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    cache_dir = None
+    if args.cache is not None:
+        from .cache import default_cache_dir
+        cache_dir = args.cache or default_cache_dir()
+    summaries = validate_batch(
+        inputs, args.output_dir, max_workers=args.jobs, cache_dir=cache_dir, backend=args.reader,
+        duplicate_window_days=args.duplicate_window,
+    )
+    summary_path = args.summary or os.path.join(args.output_dir, "summary.csv")
+    write_summary(summaries, summary_path)
+
+    if args.json:
+        json.dump(summaries, sys.stdout, ensure_ascii=False, indent=2)
+        sys.stdout.write("\n")
+    else:
+        for summary in summaries:
+            status = "ERROR" if summary["error"] else "PASS" if summary["passed"] else "FAIL"
+            print(f"{status}  {summary['input_path']}")
+        print(f"Summary written to {summary_path}")
+
+    if any(summary["error"] for summary in summaries):
+        return 2
+    return 0 if all(summary["passed"] for summary in summaries) else 1
+
+def main(argv=None):
+    """Validate one template or a batch. Exits 0 when every check passes, 1 when a check fails and 2 on errors."""
+    args = build_parser().parse_args(argv)
+    if is_single_file(args.inputs):
+        return run_single(args)
+    return run_batch(args)
@@ -0,0 +1,139 @@
+import os
+from contextlib import contextmanager
+
+from .backends import XLSX_BACKENDS, read_tab_file, xlsx_backend
+from .cache import cache_key, frame_digest, series_digest, sheet_digests
+from .ingest import sheet_frame, table_frame
+from .profiling import Instrumentation
+from .schema import compact_frame, display_amounts, unparsed_cells
+from .writer import write_excel
+
+# How the rows of each input sheet are laid out into its DataFrame.
+SHEET_LAYOUTS = {
+    "Comparative Trial Balances": table_frame,
+    "Journal Entries & Lines": table_frame,
+    "Mapping Categories": sheet_frame,
+}
+
+class ValidationContext:
+    """Parsed input sheets and pending output highlights shared by every check in a validation run.
+
+    With a ResultCache, sheets whose raw content is unchanged since an earlier run are loaded
+    from the cache instead of being parsed, and digests holds a content hash of every sheet.
+    frames, keyed by sheet name, supplies sheets that have already been read, and tab_files
+    sheets to read from CSV, Parquet or Feather files instead of the template. The rest are read
+    with the named xlsx backend (see backends.xlsx_backend). Every sheet is converted to the
+    compact schema as it is read (see schema); descriptions holds the description row each
+    table tab had, and unparsed the amounts and dates that did not parse, which are highlighted
+    in the output with their original values. Reading, writing and every check are timed as
+    stages of instrumentation.
+    """
+
+    def __init__(self, input_file_path, output_file_path, output_directory, cache=None, frames=None,
+                 instrumentation=None, backend=None, tab_files=None):
+        self.input_file_path = input_file_path
+        self.output_file_path = output_file_path
+        self.output_directory = output_directory
+        self.cache = cache
+        self.instrumentation = instrumentation or Instrumentation()
+
+        frames = dict(frames or {})
+        unparsed = {}
+        for sheet_name, path in (tab_files or {}).items():
+            if sheet_name not in SHEET_LAYOUTS:
+                raise ValueError(f"Unknown input tab {sheet_name!r}")
+            if sheet_name not in frames:
+                file_type = os.path.splitext(path)[1].lstrip(".").lower()
+                with self.instrumentation.stage(f"read_{file_type}[{sheet_name}]") as stage:
+                    frames[sheet_name] = compact_frame(
+                        read_tab_file(path, sheet_name), sheet_name, unparsed.setdefault(sheet_name, {}),
+                    )
+                    stage["rows"] = len(frames[sheet_name])
+
+        unread = [sheet_name for sheet_name in SHEET_LAYOUTS if frames.get(sheet_name) is None]
+        self.backend = xlsx_backend(backend)
+        raw_keys = {}
+        if cache is not None and unread:
+            raw_digests = sheet_digests(input_file_path, unread)
+            for sheet_name in unread:
+                if sheet_name in raw_digests:
+                    raw_keys[sheet_name] = cache_key("sheet", self.backend, raw_digests[sheet_name])
+                    cached = cache.get(raw_keys[sheet_name])
+                    if cached is not None:
+                        frames[sheet_name], unparsed[sheet_name] = cached
+
+        unread = [sheet_name for sheet_name in unread if frames.get(sheet_name) is None]
+        if unread:
+            with XLSX_BACKENDS[self.backend](input_file_path) as sheet_rows:
+                for sheet_name in unread:
+                    with self.instrumentation.stage(f"read_{self.backend}[{sheet_name}]") as stage:
+                        df = SHEET_LAYOUTS[sheet_name](sheet_rows(sheet_name))
+                        frames[sheet_name] = compact_frame(df, sheet_name, unparsed.setdefault(sheet_name, {}))
+                        stage["rows"] = len(frames[sheet_name])
+                    if sheet_name in raw_keys:
+                        cache.put(raw_keys[sheet_name], (frames[sheet_name], unparsed[sheet_name]))
+
+        frames = {
+            sheet_name: compact_frame(df, sheet_name, unparsed.setdefault(sheet_name, {}))
+            for sheet_name, df in frames.items()
+        }
+        self.descriptions = {sheet_name: df.attrs.get("description") for sheet_name, df in frames.items()}
+        self.unparsed = unparsed
+        self.df_ctb = frames["Comparative Trial Balances"]
+        self.df_jel = frames["Journal Entries & Lines"]
+        self.df_mapping = frames["Mapping Categories"]
+        self.digests = {}
+        if cache is not None:
+            # The original text of unparsed values only shows in the output, but it is part of the sheet.
+            self.digests = {
+                sheet_name: cache_key(frame_digest(df), *(
+                    f"{position}={series_digest(values)}" for position, values in sorted(unparsed[sheet_name].items())
+                ))
+                for sheet_name, df in frames.items()
+            }
+
+        self.highlights = {}
+        self._recorded = None
+        for sheet_name, sheet_unparsed in self.unparsed.items():
+            for index, position, _ in unparsed_cells(sheet_unparsed):
+                self.highlight(sheet_name, index + 2, [position + 1])
+
+    def highlight(self, sheet_name, row, columns):
+        """Mark cells of an output row to be filled as invalid when the workbook is written."""
+        self.highlights.setdefault(sheet_name, {}).setdefault(row, set()).update(columns)
+        if self._recorded is not None:
+            self._recorded.append((sheet_name, row, tuple(columns)))
+
+    @contextmanager
+    def recording(self):
+        """Collect the highlights made inside the block, so a cached check can replay them."""
+        self._recorded = recorded = []
+        try:
+            yield recorded
+        finally:
+            self._recorded = None
+
+    def replay(self, highlights):
+        for sheet_name, row, columns in highlights:
+            self.highlight(sheet_name, row, columns)
+
+    def rows(self, sheet_names):
+        """Number of DataFrame rows across the named input sheets."""
+        frames = {
+            "Comparative Trial Balances": self.df_ctb,
+            "Journal Entries & Lines": self.df_jel,
+            "Mapping Categories": self.df_mapping,
+        }
+        return sum(len(frames[sheet_name]) for sheet_name in sheet_names)
+
+    def save(self):
+        rows = len(self.df_ctb) + len(self.df_jel) + len(self.df_mapping)
+        with self.instrumentation.stage("write_excel", rows):
+            write_excel(
+                display_amounts(self.df_ctb, "Comparative Trial Balances", self.unparsed["Comparative Trial Balances"]),
+                display_amounts(self.df_jel, "Journal Entries & Lines", self.unparsed["Journal Entries & Lines"]),
+                self.df_mapping,
+                self.output_file_path,
+                self.highlights,
+                self.descriptions,
+            )
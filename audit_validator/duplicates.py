@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+
+from .schema import JEL, as_text
+
+DEFAULT_WINDOW_DAYS = 3
+HIGHLIGHT_COLUMNS = [3, 4, 6, 7]
+
+def posting_days(dates):
+    """Posting day of each date of a compact journal tab (see schema) as datetime64[D], with undated lines as NaT."""
+    return dates.to_numpy().astype("datetime64[D]")
+
+def combined_codes(*codes):
+    """Dense codes of tuples of non-negative codes, assigned in order of first appearance."""
+    combined = codes[0]
+    for column in codes[1:]:
+        combined, _ = pd.factorize(combined * np.int64(column.max() + 1) + column)
+    return combined
+
+def line_keys(jel_df):
+    """Normalized key of every journal line that posts an amount to an account.
+
+    The key is the Account ID as text, the signed amount (debit less credit) in whole cents
+    and the posting day in days since the epoch, as integers. Returns the keys, indexed like jel_df, and the
+    Account IDs the account codes index.
+    """
+    lines = jel_df.iloc[1:]
+    cents = (lines.iloc[:, 5].fillna(0) - lines.iloc[:, 6].fillna(0)).to_numpy(np.int64)
+    account_text = as_text(lines.iloc[:, 3], strip=True)
+    accounts = account_text.cat.codes.to_numpy().astype(np.int64)
+    account_ids = account_text.cat.categories
+    days = posting_days(lines.iloc[:, 2])
+
+    keys = pd.DataFrame({
+        # Plain Python IDs, so the entries built from them stay JSON-serializable.
+        "journal_id": lines.iloc[:, 0].to_numpy(dtype=object),
+        "account": accounts,
+        "cents": cents,
+        "amount": pd.factorize(cents)[0],
+        "day": days.astype(np.int64),
+        "dated": ~np.isnat(days),
+    }, index=lines.index)
+    return keys[(accounts >= 0) & (cents != 0)], account_ids
+
+def exact_duplicates(keys):
+    """(position, matched position) of every line whose key an earlier line already has.
+
+    Keys are hashed into group codes in one pass, so this is linear in the number of lines.
+    """
+    if keys.empty:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    day_codes, _ = pd.factorize(keys["day"].to_numpy())
+    codes = combined_codes(keys["account"].to_numpy(), keys["amount"].to_numpy(), day_codes)
+    # Codes are numbered in order of first appearance, so each code's first line is where the
+    # running maximum first reaches it.
+    first_appearance = np.r_[True, codes[1:] > np.maximum.accumulate(codes)[:-1]]
+    first = np.flatnonzero(first_appearance)[codes]
+    positions = np.arange(len(codes))
+    repeated = first != positions
+    return positions[repeated], first[repeated]
+
+def near_duplicates(keys, window_days):
+    """(position, matched position) of lines posting an account and amount already posted on an
+    earlier day at most window_days before.
+
+    Lines are sorted once by account, amount and date, so each line only needs comparing with
+    the line before it.
+    """
+    if keys.empty:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    dated = np.flatnonzero(keys["dated"].to_numpy())
+    if window_days <= 0 or len(dated) < 2:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+
+    codes = combined_codes(keys["account"].to_numpy()[dated], keys["amount"].to_numpy()[dated])
+    days = keys["day"].to_numpy()[dated]
+    order = np.lexsort((days, codes))
+    codes, days, dated = codes[order], days[order], dated[order]
+
+    gaps = np.diff(days)
+    near = (codes[1:] == codes[:-1]) & (gaps > 0) & (gaps <= window_days)
+    return dated[1:][near], dated[:-1][near]
+
+def check_duplicate_lines(context, window_days=DEFAULT_WINDOW_DAYS):
+    """Flag journal lines that repeat another line's account, amount and date, and lines posting the
+    same account and amount within window_days of another line.
+
+    Returns a message and one (row, journal_id, account_id, amount, date, matched_row,
+    matched_journal_id, kind) entry per flagged line, where kind is "repeated" for a line
+    repeated within its journal, "duplicate" for one posted again under another journal and
+    "near-duplicate" for one within the date window. Both lines of every pair are highlighted.
+    """
+    keys, account_ids = line_keys(context.df_jel)
+    exact = exact_duplicates(keys)
+    near = near_duplicates(keys, window_days)
+
+    rows = keys.index.to_numpy() + 2
+    journal_ids = keys["journal_id"].to_numpy()
+    accounts = keys["account"].to_numpy()
+    cents = keys["cents"].to_numpy()
+    days = keys["day"].to_numpy()
+    dated = keys["dated"].to_numpy()
+
+    entries = []
+    for (positions, matches), exact_match in ((exact, True), (near, False)):
+        for position, match in zip(positions.tolist(), matches.tolist()):
+            if not exact_match:
+                kind = "near-duplicate"
+            elif journal_ids[position] == journal_ids[match]:
+                kind = "repeated"
+            else:
+                kind = "duplicate"
+            date = str(np.datetime64(int(days[position]), "D")) if dated[position] else ""
+            entries.append((
+                int(rows[position]), journal_ids[position], account_ids[accounts[position]],
+                float(cents[position] / 100), date, int(rows[match]),
+                journal_ids[match], kind,
+            ))
+    entries.sort(key=lambda entry: (entry[0], entry[7]))
+
+    for row in sorted({entry[0] for entry in entries} | {entry[5] for entry in entries}):
+        context.highlight(JEL, row, HIGHLIGHT_COLUMNS)
+
+    if not entries:
+        return "No duplicate or near-duplicate journal lines found. ✅", entries
+    when = f"on the same date or within {window_days} day(s)" if window_days > 0 else "on the same date"
+    return (
+        f"{len({entry[0] for entry in entries})} journal line(s) repeat the account and amount of another "
+        f"line {when}. ❌",
+        entries,
+    )
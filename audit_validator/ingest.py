@@ -0,0 +1,54 @@
+import itertools
+
+import pandas as pd
+
+def frame_from_rows(header, rows):
+    """Build a DataFrame from sheet rows, naming columns the way pandas.read_excel does."""
+    columns = []
+    seen = {}
+    for index, name in enumerate(header):
+        if name is None:
+            name = f"Unnamed: {index}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        columns.append(name)
+    return pd.DataFrame(rows, columns=columns)
+
+def fixed_width(rows, width):
+    """Pad or truncate every row to exactly width cells."""
+    for row in rows:
+        row = tuple(row)
+        yield row[:width] + (None,) * (width - len(row))
+
+def table_frame(rows, max_col=7):
+    """Columns A:G from the header down to the last consecutive non-empty row in column A."""
+    rows = fixed_width(rows, max_col)
+    header = next(rows, None)
+    if header is None or header[0] is None:
+        return frame_from_rows(header or (), [])
+    data = list(itertools.takewhile(lambda row: row[0] is not None, rows))
+    return frame_from_rows(header, data)
+
+def sheet_frame(rows):
+    """Every used row and column of a sheet, dropping trailing empty rows and columns."""
+    kept = []
+    last_used = 0
+    width = 0
+    for row in rows:
+        row = tuple(row)
+        used = len(row)
+        while used and row[used - 1] is None:
+            used -= 1
+        kept.append(row[:used])
+        if used:
+            last_used = len(kept)
+            width = max(width, used)
+    del kept[last_used:]
+
+    if not kept:
+        return pd.DataFrame()
+    header, *data = fixed_width(kept, width)
+    return frame_from_rows(header, data)
@@ -0,0 +1,149 @@
+"""Per-journal balancing over fixed-size chunks of journal lines, with compact per-journal state.
+
+Journal IDs are integer codes into the journal tab's categories (see schema), so the state is
+one slot per journal in a handful of integer and datetime arrays indexed by code: debit and
+credit totals in cents, earliest and latest date, line count, undated line count and the
+position of the journal's first line. Each chunk of lines is reduced with a groupby on the
+codes and folded into those arrays, so balancing needs the state and one chunk of typed lines
+on top of the journal tab itself, which the other checks and the output workbook hold in
+memory anyway. The report rows come back in order of each journal's first line, as the
+in-memory groupby gives them.
+"""
+import numpy as np
+import pandas as pd
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+ACCUMULATORS = {
+    "debit": "sum",
+    "credit": "sum",
+    "earliest": "min",
+    "latest": "max",
+    "lines": "sum",
+    "undated": "sum",
+    "first_line": "min",
+}
+
+REPORT_COLUMNS = ["Journal ID", "Net Balance", "Earliest Date", "Latest Date", "Date Difference (Days)"]
+
+def typed_lines(lines):
+    """Lines of a compact journal tab (see schema) as date, and debit and credit in cents."""
+    return pd.DataFrame({
+        "date": lines.iloc[:, 2].to_numpy().astype("datetime64[ns]"),
+        "debit": lines.iloc[:, 5].fillna(0).astype(np.int64).to_numpy(),
+        "credit": lines.iloc[:, 6].fillna(0).astype(np.int64).to_numpy(),
+    }, index=lines.index)
+
+def journal_lines(df):
+    """Return the journal lines below the template's description row as typed columns."""
+    return typed_lines(df.iloc[1:])
+
+def journal_codes(df):
+    """Integer code of every line's Journal ID below the description row, and the IDs they index.
+
+    Lines without a Journal ID share the last code, whose ID is None.
+    """
+    ids = df.iloc[1:, 0]
+    if not isinstance(ids.dtype, pd.CategoricalDtype):
+        ids = ids.astype("category")
+    journal_ids = np.append(ids.cat.categories.to_numpy(dtype=object), None)
+    codes = ids.cat.codes.to_numpy().astype(np.int64)
+    codes[codes < 0] = len(journal_ids) - 1
+    return codes, journal_ids
+
+def journal_chunks(df, codes, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield (codes, typed lines) for the lines below the description row, chunk_size lines at a time."""
+    for start in range(0, len(codes), chunk_size):
+        yield codes[start:start + chunk_size], typed_lines(df.iloc[1 + start:1 + start + chunk_size])
+
+def reduce_chunk(codes, lines, first_line=0):
+    """Accumulators of every journal in a chunk of typed lines, indexed by journal code.
+
+    first_line is the position of the chunk's first line among all the lines.
+    """
+    dates = lines["date"].to_numpy()
+    frame = pd.DataFrame({
+        "debit": lines["debit"].to_numpy(),
+        "credit": lines["credit"].to_numpy(),
+        "earliest": dates,
+        "latest": dates,
+        "lines": 1,
+        "undated": np.isnat(dates).astype(np.int64),
+        "first_line": np.arange(first_line, first_line + len(lines)),
+    })
+    return frame.groupby(codes, sort=False).agg(ACCUMULATORS)
+
+class JournalBalances:
+    """Accumulates journal balances chunk by chunk in arrays with one slot per journal code."""
+
+    def __init__(self, journal_ids):
+        self.journal_ids = journal_ids
+        slots = len(journal_ids)
+        self.lines = 0
+        self._debit = np.zeros(slots, dtype=np.int64)
+        self._credit = np.zeros(slots, dtype=np.int64)
+        self._earliest = np.full(slots, np.datetime64("NaT"), dtype="datetime64[ns]")
+        self._latest = np.full(slots, np.datetime64("NaT"), dtype="datetime64[ns]")
+        self._lines = np.zeros(slots, dtype=np.int64)
+        self._undated = np.zeros(slots, dtype=np.int64)
+        self._first_line = np.full(slots, np.iinfo(np.int64).max, dtype=np.int64)
+
+    def add(self, codes, lines):
+        """Fold a chunk of typed journal lines (see typed_lines) and their journal codes into the state."""
+        partial = reduce_chunk(codes, lines, self.lines)
+        self.lines += len(lines)
+        slots = partial.index.to_numpy()
+        self._debit[slots] += partial["debit"].to_numpy()
+        self._credit[slots] += partial["credit"].to_numpy()
+        # fmin and fmax skip NaT, so undated lines never hide a journal's dates.
+        self._earliest[slots] = np.fmin(self._earliest[slots], partial["earliest"].to_numpy())
+        self._latest[slots] = np.fmax(self._latest[slots], partial["latest"].to_numpy())
+        self._lines[slots] += partial["lines"].to_numpy()
+        self._undated[slots] += partial["undated"].to_numpy()
+        self._first_line[slots] = np.minimum(self._first_line[slots], partial["first_line"].to_numpy())
+
+    def accumulators(self):
+        """The accumulators of every journal seen, in order of its first line."""
+        seen = np.flatnonzero(self._lines)
+        seen = seen[np.argsort(self._first_line[seen], kind="stable")]
+        return pd.DataFrame({
+            "journal_id": self.journal_ids[seen],
+            "debit": self._debit[seen],
+            "credit": self._credit[seen],
+            "earliest": self._earliest[seen],
+            "latest": self._latest[seen],
+            "lines": self._lines[seen],
+            "undated": self._undated[seen],
+        })
+
+def journal_balances(df, chunk_size=None):
+    """Balance every journal of a journal tab, chunk_size lines at a time (all at once by default)."""
+    if chunk_size is not None and chunk_size < 1:
+        raise ValueError(f"chunk_size must be a positive number of lines, not {chunk_size!r}")
+    codes, journal_ids = journal_codes(df)
+    balances = JournalBalances(journal_ids)
+    for chunk_codes, lines in journal_chunks(df, codes, chunk_size or max(len(codes), 1)):
+        balances.add(chunk_codes, lines)
+    return balances
+
+def journal_report(accumulators):
+    """The je_list rows for combined accumulators, and whether every journal balances on one date.
+
+    A journal spans several dates when its earliest and latest dates differ, or when it has
+    both dated and undated lines.
+    """
+    net_cents = accumulators["debit"] - accumulators["credit"]
+    undated = accumulators["undated"]
+    several_dates = (
+        accumulators["earliest"].lt(accumulators["latest"])
+        | (undated.gt(0) & undated.lt(accumulators["lines"]))
+    )
+    report = pd.DataFrame({
+        "Journal ID": accumulators["journal_id"].to_numpy(),
+        "Net Balance": (net_cents / 100).to_numpy(),
+        "Earliest Date": accumulators["earliest"].to_numpy(),
+        "Latest Date": accumulators["latest"].to_numpy(),
+        "Date Difference (Days)": (accumulators["latest"] - accumulators["earliest"]).dt.days.to_numpy(),
+    })
+    all_balanced = not ((net_cents != 0) | several_dates).any()
+    return report, all_balanced
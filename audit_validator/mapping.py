@@ -0,0 +1,62 @@
+from collections import OrderedDict
+
+import pandas as pd
+
+from .cache import frame_digest
+
+# Column of the "Mapping Categories" sheet that lists the Account Mappings allowed for each Account Type.
+CATEGORY_COLUMNS = {
+    "Assets": 1,
+    "Liabilities": 2,
+    "Equity": 3,
+    "Income": 4,
+    "Expenses": 5
+}
+
+MAX_CACHED_INDEXES = 32
+
+_index_cache = OrderedDict()
+
+def normalize(series):
+    return series.dropna().astype(str).str.strip()
+
+class MappingIndex:
+    """Normalized Account Types and (Account Type, Account Mapping) pairs from a "Mapping Categories" sheet."""
+
+    def __init__(self, categories, pairs):
+        self.categories = pd.Index(sorted(categories))
+        self.pairs = pd.MultiIndex.from_tuples(sorted(pairs), names=["category", "value"])
+
+    @classmethod
+    def from_frame(cls, mapping_df):
+        categories = set(normalize(mapping_df.iloc[:, 0])) if len(mapping_df.columns) else set()
+        pairs = set()
+        for category, column in CATEGORY_COLUMNS.items():
+            if column < len(mapping_df.columns):
+                pairs.update((category, value) for value in normalize(mapping_df.iloc[:, column]))
+        return cls(categories, pairs)
+
+    def invalid_rows(self, categories, values):
+        """Return boolean masks of rows whose Account Type, or whose Account Mapping for that type, is not allowed.
+
+        Rows with a mapping column in CATEGORY_COLUMNS are checked against that column's values;
+        other valid Account Types have no allowed-value list, as on the template.
+        """
+        invalid_category = ~categories.isin(self.categories).to_numpy()
+        checked = ~invalid_category & categories.isin(list(CATEGORY_COLUMNS)).to_numpy()
+        pairs = pd.MultiIndex.from_arrays([categories, values])
+        invalid_value = checked & ~pairs.isin(self.pairs)
+        return invalid_category, invalid_value
+
+def mapping_index(mapping_df):
+    """Return the MappingIndex for a mapping sheet, compiling each distinct sheet once per process."""
+    key = frame_digest(mapping_df)
+    index = _index_cache.get(key)
+    if index is None:
+        index = MappingIndex.from_frame(mapping_df)
+        _index_cache[key] = index
+        if len(_index_cache) > MAX_CACHED_INDEXES:
+            _index_cache.popitem(last=False)
+    else:
+        _index_cache.move_to_end(key)
+    return index
@@ -0,0 +1,129 @@
+import cProfile
+import io
+import json
+import logging
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on the instrumented stages of one validation run, for progress reporting.
+STAGE_COUNT = 14
+
+def peak_rss_mb():
+    """High-water mark of the process's resident memory in MB, or None where it is unavailable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+class ValidationCancelled(Exception):
+    """Raised at the start of a stage once the run's cancel event has been set."""
+
+class Instrumentation:
+    """Per-stage timings of a validation run: elapsed time, rows processed, throughput and peak memory.
+
+    on_stage, when given, is called with each stage's record as soon as the stage finishes. Setting
+    cancel_event (a threading.Event) stops the run before its next stage with ValidationCancelled.
+    """
+
+    def __init__(self, on_stage=None, cancel_event=None):
+        self.on_stage = on_stage
+        self.cancel_event = cancel_event
+        self.stages = []
+        self._origin = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """Time the block as one stage. The yielded record's "rows" may be set inside the block."""
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise ValidationCancelled(f"Validation cancelled before {name}")
+        record = {"name": name, "rows": rows}
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            elapsed = time.perf_counter() - start
+            record["start_seconds"] = start - self._origin
+            record["seconds"] = elapsed
+            record["rows_per_second"] = record["rows"] / elapsed if record["rows"] and elapsed > 0 else None
+            record["peak_rss_mb"] = peak_rss_mb()
+            if tracemalloc.is_tracing():
+                record["traced_peak_mb"] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+            self.stages.append(record)
+            logger.info(format_stage(record))
+            if self.on_stage is not None:
+                self.on_stage(record)
+
+    def summary_lines(self):
+        return [format_stage(record) for record in self.stages]
+
+    def chrome_trace(self):
+        """The stages as complete ("X") events in Chrome's trace event format, for chrome://tracing or Perfetto."""
+        events = []
+        for record in self.stages:
+            args = {key: value for key, value in record.items()
+                    if key not in ("name", "start_seconds", "seconds") and value is not None}
+            events.append({
+                "name": record["name"],
+                "cat": "validation",
+                "ph": "X",
+                "ts": record["start_seconds"] * 1_000_000,
+                "dur": record["seconds"] * 1_000_000,
+                "pid": 1,
+                "tid": 1,
+                "args": args,
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f, indent=2)
+
+def format_stage(record):
+    line = f"{record['name']}: {record['seconds']:.3f}s"
+    if record["rows"]:
+        line += f", {record['rows']:,} rows"
+    if record["rows_per_second"]:
+        line += f", {record['rows_per_second']:,.0f} rows/s"
+    if record["peak_rss_mb"] is not None:
+        line += f", peak RSS {record['peak_rss_mb']:,.0f} MB"
+    return line
+
+@contextmanager
+def profiled(output_prefix, top=30):
+    """Profile the block with cProfile and tracemalloc, dumping the hot spots next to output_prefix.
+
+    Writes <output_prefix>.prof (loadable with pstats or snakeviz) and <output_prefix>-hotspots.txt
+    with the functions taking the most cumulative time and the lines holding the most memory.
+    While tracing, each Instrumentation stage also records its own traced_peak_mb.
+    """
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+        profiler.dump_stats(output_prefix + ".prof")
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(top)
+        report.write(f"\nTop {top} lines by memory still allocated at the end of the run:\n")
+        for stat in snapshot.statistics("lineno")[:top]:
+            report.write(f"{stat}\n")
+        with open(output_prefix + "-hotspots.txt", "w", encoding="utf-8") as f:
+            f.write(report.getvalue())
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+from .schema import as_text
+
+def ctb_accounts(ctb_df):
+    """Account IDs and balances in cents of the trial balance rows below the description row."""
+    accounts = ctb_df.iloc[1:]
+    accounts = accounts[accounts['Account ID'].notna()]
+    return pd.DataFrame({
+        "account_id": as_text(accounts['Account ID']),
+        "prior": accounts.iloc[:, 2].fillna(0).astype(np.int64),
+        "current": accounts.iloc[:, 3].fillna(0).astype(np.int64),
+    })
+
+def jel_activity(jel_df):
+    """Net journal-entry activity (debits less credits) in cents per Account ID, in order of first appearance."""
+    lines = jel_df.iloc[1:]
+    lines = lines[lines['Account ID'].notna()]
+    activity = lines.iloc[:, 5].fillna(0).astype(np.int64) - lines.iloc[:, 6].fillna(0).astype(np.int64)
+    activity = activity.groupby(as_text(lines['Account ID']), sort=False, observed=True).sum()
+    activity.index = activity.index.astype(object)
+    return activity
+
+def check_roll_forward(context):
+    """Check that each account's journal-entry activity equals its current less prior period balance.
+
+    Accounts missing from the trial balance are treated as having zero balances.
+    """
+    accounts = ctb_accounts(context.df_ctb)
+    balances = accounts.groupby("account_id", sort=False, observed=True)[["prior", "current"]].sum()
+    balances.index = balances.index.astype(object)
+    activity = jel_activity(context.df_jel)
+
+    account_ids = balances.index.union(activity.index, sort=False)
+    change = (balances["current"] - balances["prior"]).reindex(account_ids, fill_value=0)
+    activity = activity.reindex(account_ids, fill_value=0)
+    out_of_balance = change != activity
+
+    exceptions = [
+        (account_id, expected / 100, actual / 100)
+        for account_id, expected, actual in zip(
+            account_ids[out_of_balance], change[out_of_balance].tolist(), activity[out_of_balance].tolist()
+        )
+    ]
+
+    rows = accounts.index[accounts["account_id"].astype(object).isin(account_ids[out_of_balance])]
+    for row in (rows + 2).tolist():
+        context.highlight("Comparative Trial Balances", row, [4])
+
+    if not exceptions:
+        return "All account balances roll forward from the prior period through the journal entries. ✅", exceptions
+    return (
+        f"{len(exceptions)} account(s) do not roll forward: the current less prior period balance "
+        f"differs from the journal-entry activity. ❌",
+        exceptions,
+    )
+
+def find_missing_accounts(jel_df, ctb_df):
+    """Account IDs used in the journal lines but absent from the trial balance, in order of first use."""
+    jel_account_ids = pd.Index(jel_activity(jel_df).index)
+    ctb_account_ids = pd.Index(ctb_accounts(ctb_df)["account_id"].astype(object))
+    return jel_account_ids[~jel_account_ids.isin(ctb_account_ids)].tolist()
+
+def append_missing_accounts(context, missing_account_ids):
+    """Append zero-balance trial balance rows for the missing accounts in one bulk concat."""
+    if not missing_account_ids:
+        return
+
+    first_row = len(context.df_ctb) + 2
+    columns = context.df_ctb.columns
+    missing_rows = pd.DataFrame({
+        columns[0]: missing_account_ids,
+        columns[1]: missing_account_ids,
+        columns[2]: 0,
+        columns[3]: 0,
+    }, columns=columns)
+    # Blank columns take the trial balance's dtypes, so the concat keeps the compact schema.
+    blank = [name for name in columns if missing_rows[name].isna().all()]
+    missing_rows = missing_rows.astype(context.df_ctb[blank].dtypes.to_dict())
+    context.df_ctb = pd.concat([context.df_ctb, missing_rows], ignore_index=True)
+    for row in range(first_row, first_row + len(missing_account_ids)):
+        context.highlight("Comparative Trial Balances", row, [5, 6, 7])
+
+def check_account_id_in_ctb(context):
+    """Append every Account ID used in the journal lines but missing from the trial balance."""
+    missing_account_ids = find_missing_accounts(context.df_jel, context.df_ctb)
+    append_missing_accounts(context, missing_account_ids)
+    return missing_account_ids
@@ -0,0 +1,261 @@
+import os
+from dataclasses import asdict, dataclass, field
+
+from .cache import cache_key
+from .checks import (
+    check_balance_sums,
+    check_debit_credit_sums,
+    journal_entry_balance_message,
+    process_journal_entries,
+    summarize_journal_entries,
+    validate_comparative_trial_balances,
+    write_je_list,
+)
+from .context import ValidationContext
+from .duplicates import DEFAULT_WINDOW_DAYS, check_duplicate_lines
+from .reconciliation import append_missing_accounts, check_roll_forward, find_missing_accounts
+from .schema import CTB, DATE_COLUMNS, JEL, MAPPING, unparsed_cells
+
+OUTPUT_FILE_NAME = 'output_file.xlsx'
+JE_LIST_NAME = 'je_list.xlsx'
+MAX_LISTED_EXCEPTIONS = 50
+
+# Input sheets each check reads. With a cache, a check is only recomputed when one of them changed.
+CHECK_INPUTS = {
+    "validate_comparative_trial_balances": (CTB, MAPPING),
+    "check_balance_sums": (CTB,),
+    "check_debit_credit_sums": (JEL,),
+    "summarize_journal_entries": (JEL,),
+    "check_duplicate_lines": (JEL,),
+    "check_roll_forward": (CTB, JEL),
+    "find_missing_accounts": (CTB, JEL),
+}
+
+@dataclass
+class ValidationResult:
+    """Outcome of validating one template, with the log lines the GUI shows."""
+
+    input_path: str
+    output_path: str
+    je_list_path: str
+    balance_check: str = ""
+    invalid_mappings: list = field(default_factory=list)
+    debit_credit_check: str = ""
+    journal_entry_check: str = ""
+    duplicate_check: str = ""
+    duplicate_lines: list = field(default_factory=list)
+    roll_forward_check: str = ""
+    roll_forward_exceptions: list = field(default_factory=list)
+    missing_account_ids: list = field(default_factory=list)
+    unparsed_values: list = field(default_factory=list)
+    cached_checks: list = field(default_factory=list)
+    stages: list = field(default_factory=list)
+    log: list = field(default_factory=list)
+
+    @property
+    def passed(self):
+        checks = [
+            self.balance_check, self.debit_credit_check, self.journal_entry_check, self.duplicate_check,
+            self.roll_forward_check,
+        ]
+        return (
+            all(check.endswith("✅") for check in checks)
+            and not self.invalid_mappings
+            and not self.missing_account_ids
+            and not self.unparsed_values
+        )
+
+    def to_dict(self):
+        result = asdict(self)
+        result["passed"] = self.passed
+        return result
+
+def mapping_messages(invalid_entries):
+    if not invalid_entries:
+        return [
+            "All Account Types match one of the options on the Mapping Categories tab. ✅",
+            "All Account Mappings match one of the options on the Mapping Categories tab. ✅",
+            "All Account Mappings have a matching Account Type. ✅",
+        ]
+
+    messages = ["Invalid mappings found in the 'Comparative Trial Balances' tab:"]
+    for entry in invalid_entries:
+        if len(entry) == 2:
+            row, category = entry
+            messages.append(f"Row {row}: Category '{category}' not found in 'Mapping Categories'")
+        else:
+            row, category, value = entry
+            messages.append(f"Row {row}: Value '{value}' not valid for category '{category}' in 'Mapping Categories'")
+    return messages
+
+def unparsed_values(context, sheet_name):
+    """(row, column name, original text, expected kind) of every amount or date on a tab that did not parse."""
+    columns = context.df_ctb.columns if sheet_name == CTB else context.df_jel.columns
+    return [
+        (index + 2, columns[position], str(value), "date" if position in DATE_COLUMNS.get(sheet_name, ()) else "number")
+        for index, position, value in unparsed_cells(context.unparsed[sheet_name])
+    ]
+
+def unparsed_messages(entries):
+    messages = []
+    for row, column, value, kind in entries[:MAX_LISTED_EXCEPTIONS]:
+        if kind == "date":
+            messages.append(f"Row {row}: {column} '{value}' is not a date (use m/d/yyyy or yyyy-mm-dd) ❌")
+        else:
+            messages.append(f"Row {row}: {column} '{value}' is not a number ❌")
+    if len(entries) > MAX_LISTED_EXCEPTIONS:
+        messages.append(f"...and {len(entries) - MAX_LISTED_EXCEPTIONS} more value(s).")
+    return messages
+
+def roll_forward_messages(exceptions):
+    messages = [
+        f"Account '{account_id}': balance changed by ${expected:,.2f} but journal entries net to ${actual:,.2f}"
+        for account_id, expected, actual in exceptions[:MAX_LISTED_EXCEPTIONS]
+    ]
+    if len(exceptions) > MAX_LISTED_EXCEPTIONS:
+        messages.append(f"...and {len(exceptions) - MAX_LISTED_EXCEPTIONS} more account(s).")
+    return messages
+
+def duplicate_messages(entries):
+    messages = []
+    for row, journal_id, account_id, amount, date, matched_row, matched_journal_id, kind in entries[:MAX_LISTED_EXCEPTIONS]:
+        posting = f"account '{account_id}', ${amount:,.2f} on {date or 'no date'}"
+        if kind == "repeated":
+            messages.append(f"Row {row}: repeats row {matched_row} within journal '{journal_id}' ({posting})")
+        elif kind == "duplicate":
+            messages.append(
+                f"Row {row}: journal '{journal_id}' duplicates row {matched_row} of journal '{matched_journal_id}' ({posting})"
+            )
+        else:
+            messages.append(
+                f"Row {row}: journal '{journal_id}' posts the same account and amount as row {matched_row} "
+                f"of journal '{matched_journal_id}' on an earlier day within the window ({posting})"
+            )
+    if len(entries) > MAX_LISTED_EXCEPTIONS:
+        messages.append(f"...and {len(entries) - MAX_LISTED_EXCEPTIONS} more line(s).")
+    return messages
+
+def run_check(context, result, check, *args, **options):
+    """Run a check as an instrumented stage, or replay its cached value and highlights when none
+    of its input sheets changed. options are passed to the check as keywords and form part of
+    its cache key."""
+    name = check.__name__
+    with context.instrumentation.stage(name, context.rows(CHECK_INPUTS[name])):
+        return run_cached_check(context, result, check, *args, **options)
+
+def run_cached_check(context, result, check, *args, **options):
+    if context.cache is None:
+        return check(*args, **options)
+
+    name = check.__name__
+    key = cache_key(
+        "check", name,
+        *(context.digests[sheet_name] for sheet_name in CHECK_INPUTS[name]),
+        *(f"{option}={value!r}" for option, value in sorted(options.items())),
+    )
+    cached = context.cache.get(key)
+    if cached is not None:
+        value, highlights = cached
+        context.replay(highlights)
+        result.cached_checks.append(name)
+        return value
+
+    with context.recording() as highlights:
+        value = check(*args, **options)
+    context.cache.put(key, (value, highlights))
+    return value
+
+def write_cached_output(context, path, sheet_names, write, *options):
+    """Write an output file with write(), or restore it from the cache when the input sheets and
+    options it was last written from are unchanged."""
+    if context.cache is None:
+        write()
+        return
+
+    key = cache_key(
+        "output", os.path.basename(path),
+        *(context.digests[sheet_name] for sheet_name in sheet_names),
+        *(repr(option) for option in options),
+    )
+    cached = context.cache.get(key)
+    if cached is not None:
+        with open(path, "wb") as output_file:
+            output_file.write(cached)
+        return
+
+    write()
+    with open(path, "rb") as output_file:
+        context.cache.put(key, output_file.read())
+
+def validate(input_path, output_dir, cache=None, instrumentation=None, on_log=None, backend=None,
+             tab_files=None, duplicate_window_days=DEFAULT_WINDOW_DAYS):
+    """Validate an Audit Sight template, writing output_file.xlsx and je_list.xlsx to output_dir.
+
+    Pass a ResultCache to reuse parsed sheets, check results and output files from earlier runs
+    whose inputs are unchanged, and an Instrumentation to observe stage timings as they happen or
+    to cancel the run between stages; the timings are also returned in the result's stages.
+    on_log is called with each log line as soon as the check producing it finishes. backend
+    names the xlsx reader ("auto", "openpyxl" or "calamine") and tab_files maps tab names to
+    CSV, Parquet or Feather files read in place of those tabs of the template. Lines posting the
+    same account and amount within duplicate_window_days of each other are flagged as
+    near-duplicates; 0 only flags exact duplicates.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = os.path.join(output_dir, OUTPUT_FILE_NAME)
+    result = ValidationResult(
+        input_path=input_path,
+        output_path=output_path,
+        je_list_path=os.path.join(output_dir, JE_LIST_NAME),
+    )
+
+    context = ValidationContext(
+        input_path, output_path, output_dir, cache=cache, instrumentation=instrumentation,
+        backend=backend, tab_files=tab_files,
+    )
+    result.stages = context.instrumentation.stages
+
+    def log(*lines):
+        for line in lines:
+            result.log.append(line)
+            if on_log is not None:
+                on_log(line)
+
+    with context.instrumentation.stage("process_journal_entries", len(context.df_jel)):
+        process_journal_entries(context.df_jel)
+
+    log("----COMPARATIVE TRIAL BALANCE TAB----")
+    ctb_unparsed = unparsed_values(context, CTB)
+    log(*unparsed_messages(ctb_unparsed))
+    result.invalid_mappings = run_check(context, result, validate_comparative_trial_balances, context)
+    result.balance_check = run_check(context, result, check_balance_sums, context.df_ctb)
+    log(result.balance_check)
+    log(*mapping_messages(result.invalid_mappings))
+
+    log("----JOURNAL ENTRIES & LINES TAB----")
+    jel_unparsed = unparsed_values(context, JEL)
+    log(*unparsed_messages(jel_unparsed))
+    result.unparsed_values = [(CTB, *entry) for entry in ctb_unparsed] + [(JEL, *entry) for entry in jel_unparsed]
+    result.debit_credit_check = run_check(context, result, check_debit_credit_sums, context.df_jel)
+    log(result.debit_credit_check)
+    je_frame, all_balanced = run_check(context, result, summarize_journal_entries, context.df_jel)
+    with context.instrumentation.stage("write_je_list", len(je_frame)):
+        write_cached_output(context, result.je_list_path, (JEL,), lambda: write_je_list(je_frame, output_dir))
+    result.journal_entry_check = journal_entry_balance_message(all_balanced)
+    log(result.journal_entry_check)
+    result.duplicate_check, result.duplicate_lines = run_check(
+        context, result, check_duplicate_lines, context, window_days=duplicate_window_days,
+    )
+    log(result.duplicate_check)
+    log(*duplicate_messages(result.duplicate_lines))
+    result.roll_forward_check, result.roll_forward_exceptions = run_check(context, result, check_roll_forward, context)
+    log(result.roll_forward_check)
+    log(*roll_forward_messages(result.roll_forward_exceptions))
+    result.missing_account_ids = run_check(context, result, find_missing_accounts, context.df_jel, context.df_ctb)
+    with context.instrumentation.stage("append_missing_accounts", len(result.missing_account_ids)):
+        append_missing_accounts(context, result.missing_account_ids)
+
+    # Highlights land on every tab, so the output workbook is only reused when no tab changed.
+    write_cached_output(
+        context, output_path, (CTB, JEL, MAPPING), context.save, context.descriptions, duplicate_window_days,
+    )
+    return result
@@ -0,0 +1,123 @@
+"""Compact, exact-money schema of the trial balance and journal tabs, applied once at ingestion.
+
+IDs, Account Types and Account Mappings become categoricals, amounts nullable int64 cents and
+dates datetime64. The template's description row cannot live in typed columns, so row 0 stays
+in the frame as missing values, keeping sheet row = index + 2, and its text moves to
+attrs["description"] for the writer. Amounts and dates that do not parse are missing in the
+typed columns; compact_frame hands their original values to the caller, and display_amounts
+puts them back, highlighted, when it turns cents back into dollars for output.
+"""
+import numpy as np
+import pandas as pd
+
+CTB = "Comparative Trial Balances"
+JEL = "Journal Entries & Lines"
+MAPPING = "Mapping Categories"
+
+# Column positions of each table tab by role. Columns not listed keep their inferred dtype.
+CATEGORY_COLUMNS = {CTB: (0, 4, 5), JEL: (0, 3)}
+AMOUNT_COLUMNS = {CTB: (2, 3), JEL: (5, 6)}
+DATE_COLUMNS = {JEL: (2,)}
+# Columns read as text from CSV tab files, so IDs like 0100 keep their leading zeros.
+TEXT_COLUMNS = {CTB: (0, 1, 4, 5, 6), JEL: (0, 1, 3, 4)}
+# Formats of dates entered as text, tried in order: ISO 8601, then month first like the
+# template's m/d/yy date format. Text in any other format, such as 31/12/2024, does not parse.
+DATE_FORMATS = ("ISO8601", "%m/%d/%Y", "%m/%d/%y")
+
+def to_cents(values):
+    """Amounts as nullable int64 cents; text that is not a number becomes missing."""
+    dollars = pd.to_numeric(values, errors='coerce')
+    return pd.Series((dollars.astype("float64") * 100).round(), index=values.index).astype("Int64")
+
+def to_dates(values):
+    """Dates as datetime64; text is read in one of DATE_FORMATS and anything else becomes missing.
+
+    Each distinct text is parsed once.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    if pd.api.types.infer_dtype(values, skipna=True) in ("datetime", "datetime64", "date", "empty"):
+        return pd.Series(pd.to_datetime(values, errors="coerce"), index=values.index)
+    is_text = values.map(lambda value: isinstance(value, str)).astype(bool)
+    dates = pd.Series(pd.to_datetime(values.where(~is_text), errors="coerce"), index=values.index)
+    if is_text.any():
+        codes, texts = pd.factorize(values[is_text].str.strip())
+        parsed = pd.Series(pd.NaT, index=range(len(texts)), dtype="datetime64[ns]")
+        for date_format in DATE_FORMATS:
+            pending = parsed.isna().to_numpy()
+            parsed[pending] = np.asarray(pd.to_datetime(texts[pending], format=date_format, errors="coerce"))
+        dates[is_text] = parsed.to_numpy()[codes]
+    return dates
+
+def compact_frame(df, sheet_name, unparsed=None):
+    """Convert a table tab to the compact schema. Frames already converted are returned unchanged.
+
+    The description is taken from attrs["description"] when the reader already put it there,
+    and from row 0 otherwise. unparsed, when given a dict, receives the original values of the
+    amounts and dates that did not parse, as one Series per column position indexed like the
+    frame. They are kept out of attrs, which pandas deep-copies into every derived frame.
+    """
+    if sheet_name not in AMOUNT_COLUMNS or df.attrs.get("compact") or df.empty:
+        return df
+
+    description = df.attrs.get("description")
+    if description is None:
+        description = tuple(None if pd.isna(value) else value for value in df.iloc[0])
+    lines = df.iloc[1:]
+    columns = {}
+    for position, name in enumerate(df.columns):
+        values = lines.iloc[:, position]
+        if position in AMOUNT_COLUMNS[sheet_name] or position in DATE_COLUMNS.get(sheet_name, ()):
+            typed = to_cents(values) if position in AMOUNT_COLUMNS[sheet_name] else to_dates(values)
+            failed = (values.notna() & typed.isna()).to_numpy()
+            if failed.any() and unparsed is not None:
+                unparsed[position] = values[failed].astype(object)
+            values = typed
+        elif position in CATEGORY_COLUMNS[sheet_name]:
+            values = values.astype("category")
+        else:
+            values = values.infer_objects()
+        columns[position] = values
+
+    compact = pd.DataFrame(columns, index=lines.index).reindex(df.index)
+    compact.columns = df.columns
+    compact.attrs["description"] = description
+    compact.attrs["compact"] = True
+    return compact
+
+def unparsed_cells(unparsed):
+    """(index, position, original value) of every amount or date compact_frame could not parse, in sheet order."""
+    return sorted(
+        (index, position, value) for position, values in unparsed.items() for index, value in values.items()
+    )
+
+def display_amounts(df, sheet_name, unparsed=None):
+    """A shallow copy of a compact frame with its amounts in dollars, for writing.
+
+    unparsed, as filled in by compact_frame, puts back the original values of amounts and dates
+    that did not parse.
+    """
+    df = df.copy(deep=False)
+    for position in AMOUNT_COLUMNS.get(sheet_name, ()):
+        if pd.api.types.is_integer_dtype(df.iloc[:, position]):
+            df.isetitem(position, df.iloc[:, position] / 100)
+    for position, values in (unparsed or {}).items():
+        column = df.iloc[:, position].astype(object)
+        column.loc[values.index] = values.to_numpy()
+        df.isetitem(position, column)
+    return df
+
+def as_text(values, strip=False):
+    """The values as a categorical of their text, converting each distinct value once.
+
+    Values with the same text, like 1001 and "1001", share a category. Missing values stay
+    missing.
+    """
+    categorical = values if isinstance(values.dtype, pd.CategoricalDtype) else values.astype("category")
+    text = categorical.cat.categories.astype(str)
+    if strip:
+        text = text.str.strip()
+    text_codes, text_categories = pd.factorize(text)
+    # Code -1 (missing) picks the appended -1, so missing stays missing.
+    codes = np.append(text_codes, -1)[categorical.cat.codes.to_numpy()]
+    return pd.Series(pd.Categorical.from_codes(codes, categories=text_categories), index=values.index)
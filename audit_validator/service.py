@@ -0,0 +1,487 @@
+"""Long-running validation service that keeps one warm process for a stream of templates.
+
+Jobs arrive from a watched drop folder and a local HTTP endpoint and wait in a bounded queue for
+a fixed pool of worker processes. The workers import pandas, openpyxl and the readers once when
+they start and live as long as the service, so each job costs only its validation, and the
+Mapping Categories indexes each worker compiles stay cached for later jobs. Every job gets a
+directory under the output root holding its input (under input/), output_file.xlsx,
+je_list.xlsx and status.json, which is rewritten as the job moves from queued to running to
+done or failed. Job directories are only readable by the service's own account.
+
+HTTP endpoints:
+
+    POST /jobs        the template as the request body (name it with ?name=), or a JSON body
+                      {"path": "..."} naming a template inside the service's intake directory,
+                      when it has one; returns 202 and the status
+    GET  /jobs        the status of every job since the service started
+    GET  /jobs/<id>   the status of one job
+    GET  /health      queue and worker counts
+"""
+import argparse
+import datetime
+import importlib
+import json
+import logging
+import os
+import queue
+import shutil
+import signal
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from .batch import validate_to_summary
+from .duplicates import DEFAULT_WINDOW_DAYS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_QUEUE_SIZE = 100
+DEFAULT_POLL_INTERVAL = 2.0
+STATUS_FILE_NAME = "status.json"
+# Largest template accepted as an HTTP request body.
+MAX_UPLOAD_BYTES = 512 * 1024 * 1024
+# Runs of a job whose worker process died before it is failed. The pool breaks for every job
+# running on it, not only the one that killed its worker, so the others get another run.
+MAX_ATTEMPTS = 2
+
+class ServiceBusy(Exception):
+    """Raised when a job is submitted while queue_size jobs are already waiting or running."""
+
+def warm_up():
+    """Import everything a validation needs, so a worker's first job pays no import cost."""
+    from .backends import calamine_installed
+
+    importlib.import_module("audit_validator.runner")
+    if calamine_installed():
+        importlib.import_module("python_calamine")
+
+def init_worker():
+    """Warm a worker process up. Ctrl-C and SIGTERM reach the whole process group, so workers
+    ignore them and leave shutdown to the service, which lets their running jobs finish."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    warm_up()
+
+def now():
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+def write_status(path, status):
+    """Write a job's status JSON through a temporary file, so readers never see a partial one."""
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(status, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+def is_template(path):
+    name = os.path.basename(path)
+    return name.lower().endswith(".xlsx") and not name.startswith("~$") and not name.startswith(".")
+
+class ValidationService:
+    """A bounded job queue drained by a pool of warm worker processes.
+
+    At most queue_size jobs wait or run at once; submitting more raises ServiceBusy. workers
+    defaults to one per CPU. cache_dir, backend and duplicate_window_days apply to every job as
+    they do to a batch (see batch.validate_batch). submit_path only takes templates inside
+    intake_dir, and refuses every path when it is None.
+    """
+
+    def __init__(self, output_root, workers=None, queue_size=DEFAULT_QUEUE_SIZE, cache_dir=None, backend=None,
+                 duplicate_window_days=DEFAULT_WINDOW_DAYS, intake_dir=None):
+        self.output_root = os.path.abspath(output_root)
+        self.intake_dir = None if intake_dir is None else os.path.realpath(intake_dir)
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.cache_dir = cache_dir
+        self.backend = backend
+        self.duplicate_window_days = duplicate_window_days
+        self._queue = queue.Queue()
+        self._slots = threading.Semaphore(queue_size)
+        self._lock = threading.Lock()
+        self._pool_lock = threading.Lock()
+        self._jobs = {}
+        self._executor = None
+        self._dispatchers = []
+
+    def start(self):
+        os.makedirs(self.output_root, mode=0o700, exist_ok=True)
+        warm_up()
+        self._executor = self._start_pool()
+        for number in range(self.workers):
+            dispatcher = threading.Thread(target=self._dispatch, name=f"audit-validate-dispatch-{number}", daemon=True)
+            dispatcher.start()
+            self._dispatchers.append(dispatcher)
+
+    def _start_pool(self):
+        executor = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker)
+        # Start every worker now rather than on the first jobs.
+        for future in [executor.submit(time.sleep, 0) for _ in range(self.workers)]:
+            future.result()
+        return executor
+
+    def _replace_pool(self, broken):
+        """Swap a pool whose worker died for a fresh one, once however many jobs saw it break."""
+        with self._pool_lock:
+            if self._executor is broken:
+                broken.shutdown(wait=False)
+                self._executor = self._start_pool()
+
+    def stop(self):
+        """Finish the running jobs and mark the ones still queued as cancelled."""
+        while True:
+            try:
+                job_id = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._finish(job_id, "cancelled")
+        for _ in self._dispatchers:
+            self._queue.put(None)
+        for dispatcher in self._dispatchers:
+            dispatcher.join()
+        self._dispatchers = []
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def submit_file(self, path, move=False):
+        """Queue a template already on disk, moving it into the job directory or copying it."""
+        place = shutil.move if move else shutil.copyfile
+        return self._submit(os.path.basename(path), lambda destination: place(path, destination))
+
+    def submit_path(self, path):
+        """Queue a copy of a template named by path, which must be inside intake_dir."""
+        if self.intake_dir is None:
+            raise PermissionError("Templates can only be submitted by path when the service has an intake directory")
+        path = os.path.realpath(path)
+        if os.path.commonpath([path, self.intake_dir]) != self.intake_dir:
+            raise PermissionError(f"{path} is not inside the intake directory {self.intake_dir}")
+        if not os.path.isfile(path) or not is_template(path):
+            raise FileNotFoundError(f"No template at {path}")
+        return self.submit_file(path)
+
+    def submit_bytes(self, data, name="template.xlsx"):
+        """Queue a template received as bytes, under its file name, which must name an .xlsx file."""
+        name = os.path.basename(name)
+        if not is_template(name):
+            raise ValueError(f"{name!r} is not a template name; name the upload like template.xlsx")
+
+        def place(destination):
+            with open(destination, "wb") as f:
+                f.write(data)
+        return self._submit(name, place)
+
+    def _submit(self, name, place):
+        if not self._slots.acquire(blocking=False):
+            raise ServiceBusy(f"{self.queue_size} jobs are already waiting or running")
+        job_dir = None
+        try:
+            job_id = f"{datetime.datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+            job_dir = os.path.join(self.output_root, job_id)
+            # The input gets its own folder so no template name can clash with the outputs.
+            os.mkdir(job_dir, mode=0o700)
+            os.mkdir(os.path.join(job_dir, "input"), mode=0o700)
+            input_path = os.path.join(job_dir, "input", name)
+            place(input_path)
+        except BaseException:
+            self._slots.release()
+            if job_dir is not None:
+                shutil.rmtree(job_dir, ignore_errors=True)
+            raise
+
+        status = {
+            "id": job_id,
+            "state": "queued",
+            "input_path": input_path,
+            "output_dir": job_dir,
+            "submitted_at": now(),
+            "started_at": None,
+            "finished_at": None,
+            "seconds": None,
+            "result": None,
+        }
+        with self._lock:
+            self._jobs[job_id] = status
+        write_status(os.path.join(job_dir, STATUS_FILE_NAME), status)
+        self._queue.put(job_id)
+        logger.info("queued %s as job %s", name, job_id)
+        return dict(status)
+
+    def _update(self, job_id, **changes):
+        with self._lock:
+            status = self._jobs[job_id]
+            status.update(changes)
+            status = dict(status)
+        write_status(os.path.join(status["output_dir"], STATUS_FILE_NAME), status)
+        return status
+
+    def _finish(self, job_id, state, **changes):
+        status = self._update(job_id, state=state, finished_at=now(), **changes)
+        self._slots.release()
+        logger.info("job %s %s", job_id, state)
+        return status
+
+    def _dispatch(self):
+        while True:
+            job_id = self._queue.get()
+            if job_id is None:
+                return
+            status = self._update(job_id, state="running", started_at=now())
+            start = time.perf_counter()
+            summary = self._run(job_id, status["input_path"], status["output_dir"])
+            state = "failed" if summary["error"] else "done"
+            self._finish(job_id, state, seconds=round(time.perf_counter() - start, 3), result=summary)
+
+    def _run(self, job_id, input_path, output_dir):
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            with self._pool_lock:
+                executor = self._executor
+            try:
+                return executor.submit(
+                    validate_to_summary, input_path, output_dir, self.cache_dir, self.backend,
+                    self.duplicate_window_days,
+                ).result()
+            except BrokenProcessPool as e:
+                # A worker process died, e.g. out of memory, failing every job on the pool.
+                self._replace_pool(executor)
+                error = str(e)
+                if attempt < MAX_ATTEMPTS:
+                    logger.warning("job %s lost its worker process; running it again", job_id)
+        return {"input_path": input_path, "passed": False, "error": error}
+
+    def status(self, job_id):
+        with self._lock:
+            status = self._jobs.get(job_id)
+            return None if status is None else dict(status)
+
+    def statuses(self):
+        with self._lock:
+            return [dict(status) for status in self._jobs.values()]
+
+    def health(self):
+        with self._lock:
+            states = [status["state"] for status in self._jobs.values()]
+        return {
+            "status": "ok",
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "queued": states.count("queued"),
+            "running": states.count("running"),
+        }
+
+def watch_folder(service, folder, stop_event, interval=DEFAULT_POLL_INTERVAL):
+    """Submit every template dropped into folder, moving it into its job directory.
+
+    A file is only taken once its size and modification time are unchanged between two polls,
+    so templates still being copied in are left alone. Files are left in place while the
+    service is busy and picked up on a later poll.
+    """
+    seen = {}
+    while not stop_event.wait(interval):
+        try:
+            entries = [entry for entry in os.scandir(folder) if entry.is_file() and is_template(entry.name)]
+        except OSError as e:
+            logger.warning("cannot read watch folder %s: %s", folder, e)
+            continue
+
+        current = {}
+        for entry in entries:
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            current[entry.path] = (stat.st_size, stat.st_mtime_ns)
+
+        for path, signature in list(current.items()):
+            if seen.get(path) != signature:
+                continue
+            try:
+                service.submit_file(path, move=True)
+            except ServiceBusy:
+                break
+            except OSError as e:
+                logger.warning("cannot take %s: %s", path, e)
+            current.pop(path, None)
+        seen = current
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    server_version = "audit-validate-service"
+
+    def send_json(self, status, body):
+        data = json.dumps(body, ensure_ascii=False, indent=2).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_error_json(self, status, message):
+        self.send_json(status, {"error": message})
+
+    def do_GET(self):
+        service = self.server.service
+        parts = [part for part in urlsplit(self.path).path.split("/") if part]
+        if parts == ["health"]:
+            self.send_json(HTTPStatus.OK, service.health())
+        elif parts == ["jobs"]:
+            self.send_json(HTTPStatus.OK, service.statuses())
+        elif len(parts) == 2 and parts[0] == "jobs":
+            status = service.status(parts[1])
+            if status is None:
+                self.send_error_json(HTTPStatus.NOT_FOUND, f"No job {parts[1]!r}")
+            else:
+                self.send_json(HTTPStatus.OK, status)
+        else:
+            self.send_error_json(HTTPStatus.NOT_FOUND, f"No such endpoint {self.path!r}")
+
+    def do_POST(self):
+        service = self.server.service
+        url = urlsplit(self.path)
+        if [part for part in url.path.split("/") if part] != ["jobs"]:
+            self.send_error_json(HTTPStatus.NOT_FOUND, f"No such endpoint {self.path!r}")
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0:
+            self.send_error_json(HTTPStatus.BAD_REQUEST, "Send the template, or JSON naming its path, as the body")
+            return
+        if length > MAX_UPLOAD_BYTES:
+            self.send_error_json(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Templates are limited to {MAX_UPLOAD_BYTES} bytes")
+            return
+        body = self.rfile.read(length)
+
+        try:
+            if self.headers.get_content_type() == "application/json":
+                try:
+                    path = json.loads(body).get("path")
+                except (ValueError, AttributeError):
+                    path = None
+                if not isinstance(path, str):
+                    raise ValueError('Expected a JSON object like {"path": "..."}')
+                status = service.submit_path(path)
+            else:
+                name = parse_qs(url.query).get("name", ["template.xlsx"])[0]
+                status = service.submit_bytes(body, name)
+        except ServiceBusy as e:
+            self.send_error_json(HTTPStatus.SERVICE_UNAVAILABLE, str(e))
+            return
+        except PermissionError as e:
+            self.send_error_json(HTTPStatus.FORBIDDEN, str(e))
+            return
+        except FileNotFoundError as e:
+            self.send_error_json(HTTPStatus.BAD_REQUEST, str(e))
+            return
+        except ValueError as e:
+            self.send_error_json(HTTPStatus.BAD_REQUEST, str(e))
+            return
+        self.send_json(HTTPStatus.ACCEPTED, status)
+
+    def log_message(self, format, *args):
+        logger.debug("%s %s", self.address_string(), format % args)
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="audit-validate-service",
+        description="Keep a warm validation service running that takes templates from a drop folder and a "
+                    "local HTTP endpoint, writing each job's outputs and status.json under the output directory.",
+    )
+    parser.add_argument("-o", "--output-dir", required=True, help="directory for one subdirectory per job")
+    parser.add_argument("--watch", metavar="DIR", help="validate every .xlsx template dropped into DIR")
+    parser.add_argument(
+        "--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL, metavar="SECONDS",
+        help=f"how often the drop folder is scanned (default: {DEFAULT_POLL_INTERVAL:g})",
+    )
+    parser.add_argument(
+        "--intake-dir", metavar="DIR",
+        help='accept HTTP jobs naming a template by {"path": ...} only inside DIR (default: path jobs are refused)',
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"HTTP address to listen on (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"HTTP port (default: {DEFAULT_PORT})")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument(
+        "--queue-size", type=int, default=DEFAULT_QUEUE_SIZE, metavar="JOBS",
+        help=f"jobs allowed to wait or run at once; more are refused (default: {DEFAULT_QUEUE_SIZE})",
+    )
+    parser.add_argument(
+        "--cache", nargs="?", const="", default=None, metavar="DIR",
+        help="reuse parsed sheets and check results from earlier runs, stored in DIR "
+             "(default: ~/.cache/audit-validator)",
+    )
+    parser.add_argument(
+        "--reader", choices=["auto", "openpyxl", "calamine"], default="auto",
+        help="xlsx reader: calamine (needs python-calamine) or openpyxl (default: calamine when installed)",
+    )
+    parser.add_argument(
+        "--duplicate-window", type=int, default=DEFAULT_WINDOW_DAYS, metavar="DAYS",
+        help=f"near-duplicate date window in days (default: {DEFAULT_WINDOW_DAYS}; 0 flags exact duplicates only)",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true", help="also log every HTTP request")
+    return parser
+
+def main(argv=None):
+    """Run the service until interrupted or sent SIGTERM."""
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(message)s")
+    logger.setLevel(logging.DEBUG if args.verbose else logging.INFO)
+    for folder in (args.watch, args.intake_dir):
+        if folder and not os.path.isdir(folder):
+            print(f"audit-validate-service: no folder {folder}", file=sys.stderr)
+            return 2
+
+    cache_dir = None
+    if args.cache is not None:
+        from .cache import default_cache_dir
+        cache_dir = args.cache or default_cache_dir()
+    service = ValidationService(
+        args.output_dir, workers=args.jobs, queue_size=args.queue_size, cache_dir=cache_dir, backend=args.reader,
+        duplicate_window_days=args.duplicate_window, intake_dir=args.intake_dir,
+    )
+    try:
+        server = ThreadingHTTPServer((args.host, args.port), ServiceRequestHandler)
+    except OSError as e:
+        print(f"audit-validate-service: cannot listen on {args.host}:{args.port}: {e}", file=sys.stderr)
+        return 2
+    server.service = service
+    service.start()
+
+    stop_event = threading.Event()
+    watcher = None
+    if args.watch:
+        watcher = threading.Thread(
+            target=watch_folder, args=(service, args.watch, stop_event, args.poll_interval), daemon=True,
+        )
+        watcher.start()
+
+    def stop(signum, frame):
+        # shutdown blocks until serve_forever returns, so it cannot run on the serving thread.
+        threading.Thread(target=server.shutdown).start()
+    signal.signal(signal.SIGTERM, stop)
+
+    host, port = server.server_address[:2]
+    logger.info(
+        "listening on http://%s:%s with %d worker(s)%s", host, port, service.workers,
+        f", watching {os.path.abspath(args.watch)}" if args.watch else "",
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        if watcher is not None:
+            watcher.join()
+        server.server_close()
+        service.stop()
+        logger.info("stopped")
+    return 0
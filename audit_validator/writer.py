@@ -0,0 +1,120 @@
+import openpyxl
+from openpyxl.cell import Cell, WriteOnlyCell
+from openpyxl.styles import PatternFill, Font, Alignment, NamedStyle
+from openpyxl.utils import get_column_letter
+
+ACCOUNTING_FORMAT = '_($* #,##0.00_);_($* (#,##0.00);_($* "-"??_);_(@_)'
+HEADER_FILL = PatternFill(start_color="002060", end_color="002060", fill_type="solid")
+SECOND_ROW_FILL = PatternFill(start_color="0070C0", end_color="0070C0", fill_type="solid")
+GREY_FILL = PatternFill(start_color="999999", end_color="999999", fill_type="solid")
+HIGHLIGHT_FILL = PatternFill(start_color="F7B4AE", end_color="F7B4AE", fill_type="solid")
+BANNER_FONT = Font(color="FFFFFF", bold=True)
+CENTER_ALIGNMENT = Alignment(horizontal="center")
+# Rows converted to plain values at a time, so the object copy never spans the whole frame.
+ROW_SLICE = 10_000
+
+def frame_rows(df, slice_size=ROW_SLICE):
+    """Yield each DataFrame row as a tuple of plain values, with missing values as None, converting
+    slice_size rows at a time."""
+    for start in range(0, len(df), slice_size):
+        rows = df.iloc[start:start + slice_size]
+        yield from rows.astype(object).where(rows.notna(), None).itertuples(index=False, name=None)
+
+def column_widths(df):
+    """Width of each column: its longest non-empty value or header as text, plus padding."""
+    widths = []
+    for name in df.columns:
+        values = df[name].dropna().astype(object)
+        values = values[values.astype(bool)]
+        longest = values.astype(str).str.len().max() if len(values) else 0
+        widths.append(max(len(str(name)), longest) + 2)
+    return widths
+
+def styled_cell(sheet, value, style=None, fill=None, font=None, alignment=None):
+    cell = WriteOnlyCell(sheet, value=value)
+    if style is not None:
+        cell.style = style
+    if fill is not None:
+        cell.fill = fill
+    if font is not None:
+        cell.font = font
+    if alignment is not None:
+        cell.alignment = alignment
+    return cell
+
+def write_sheet(workbook, sheet_name, df, second_row_fills=None, column_styles=None, highlights=None,
+                description=None):
+    """Stream a DataFrame into a write-only sheet, styling each cell as its row is emitted.
+
+    When second_row_fills is given the sheet gets the template banner: a dark blue header,
+    the description row filled per column, and fitted column widths. description, when given,
+    supplies the description row's values in place of the frame's first row. column_styles maps
+    a column number to the named style of every data row, and highlights maps a sheet row to
+    the column numbers to fill as invalid.
+    """
+    sheet = workbook.create_sheet(sheet_name)
+    if len(df.columns) == 0:
+        return sheet
+    column_styles = column_styles or {}
+    highlights = highlights or {}
+
+    if second_row_fills is None:
+        sheet.append([styled_cell(sheet, name, font=Font(bold=True)) for name in df.columns])
+    else:
+        widths = column_widths(df)
+        if description is not None:
+            widths = [max(width, len(str(value)) + 2) if value else width for width, value in zip(widths, description)]
+        for column, width in enumerate(widths, start=1):
+            sheet.column_dimensions[get_column_letter(column)].width = width
+        sheet.append([
+            styled_cell(sheet, name, fill=HEADER_FILL, font=BANNER_FONT, alignment=CENTER_ALIGNMENT)
+            for name in df.columns
+        ])
+
+    for row_number, values in enumerate(frame_rows(df), start=2):
+        if second_row_fills is not None and row_number == 2:
+            if description is not None:
+                values = description
+            sheet.append([
+                styled_cell(sheet, value, fill=fill, font=BANNER_FONT, alignment=CENTER_ALIGNMENT)
+                for value, fill in zip(values, second_row_fills)
+            ])
+            continue
+
+        row = list(values)
+        for column, style in column_styles.items():
+            row[column - 1] = styled_cell(sheet, row[column - 1], style=style)
+        for column in highlights.get(row_number, ()):
+            cell = row[column - 1]
+            if isinstance(cell, Cell):
+                cell.fill = HIGHLIGHT_FILL
+            else:
+                row[column - 1] = styled_cell(sheet, cell, fill=HIGHLIGHT_FILL)
+        sheet.append(row)
+    return sheet
+
+def write_excel(df1, df2, df3, output_file_path, highlights=None, descriptions=None):
+    highlights = highlights or {}
+    descriptions = descriptions or {}
+    workbook = openpyxl.Workbook(write_only=True)
+    workbook.add_named_style(NamedStyle(name="accounting_style", number_format=ACCOUNTING_FORMAT))
+    workbook.add_named_style(NamedStyle(name="date_style", number_format='m/d/yy'))
+
+    workbook.create_sheet('Instructions')
+    workbook.create_sheet('Data Validation Tests')
+    write_sheet(
+        workbook, 'Comparative Trial Balances', df1,
+        second_row_fills=[SECOND_ROW_FILL] * 7,
+        column_styles={3: "accounting_style", 4: "accounting_style"},
+        highlights=highlights.get('Comparative Trial Balances'),
+        description=descriptions.get('Comparative Trial Balances'),
+    )
+    write_sheet(
+        workbook, 'Journal Entries & Lines', df2,
+        second_row_fills=[SECOND_ROW_FILL, GREY_FILL, SECOND_ROW_FILL, SECOND_ROW_FILL, GREY_FILL, SECOND_ROW_FILL, SECOND_ROW_FILL],
+        column_styles={3: "date_style", 6: "accounting_style", 7: "accounting_style"},
+        highlights=highlights.get('Journal Entries & Lines'),
+        description=descriptions.get('Journal Entries & Lines'),
+    )
+    write_sheet(workbook, 'Mapping Categories', df3)
+    workbook.save(output_file_path)
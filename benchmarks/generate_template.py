@@ -0,0 +1,124 @@
+"""Generate synthetic Audit Sight templates for benchmarking.
+
+The templates have the three tabs the validator reads, laid out in columns A:G with a
+description row under each header, like the real template:
+
+    python benchmarks/generate_template.py template.xlsx --journal-lines 100000 --accounts 2000
+"""
+import argparse
+import datetime
+import random
+
+import openpyxl
+
+ACCOUNT_TYPES = ["Assets", "Liabilities", "Equity", "Income", "Expenses"]
+MAPPINGS_PER_TYPE = 8
+
+CTB_HEADER = [
+    "Account ID", "Account Name", "Prior Period Balance", "Current Period Balance",
+    "Account Type", "Account Mapping", "Notes",
+]
+CTB_DESCRIPTION = ["Required", "Optional", "Required", "Required", "Required", "Required", "Optional"]
+JEL_HEADER = [
+    "Journal ID", "Journal Description", "Date", "Account ID", "Line Description", "Debit", "Credit",
+]
+JEL_DESCRIPTION = ["Required", "Optional", "Required", "Required", "Optional", "Required", "Required"]
+
+def mapping_values(account_type):
+    return [f"{account_type} {index + 1}" for index in range(MAPPINGS_PER_TYPE)]
+
+def generate_template(
+    path,
+    journal_lines=10_000,
+    accounts=500,
+    unbalanced_rate=0.01,
+    invalid_mapping_rate=0.02,
+    seed=0,
+):
+    """Write a template with the given number of journal lines and trial balance accounts.
+
+    unbalanced_rate is the share of journal entries whose debits and credits differ by a few
+    cents, and invalid_mapping_rate the share of accounts with an Account Type or Account
+    Mapping missing from the Mapping Categories tab. Balances are generated in whole cents, and
+    every account's current balance is its prior balance plus its journal-entry activity.
+    """
+    rng = random.Random(seed)
+    account_ids = [str(100000 + index) for index in range(accounts)]
+    activity = dict.fromkeys(account_ids, 0)
+    start = datetime.datetime(2023, 1, 1)
+
+    workbook = openpyxl.Workbook(write_only=True)
+    workbook.create_sheet("Instructions")
+    workbook.create_sheet("Data Validation Tests")
+    ctb_sheet = workbook.create_sheet("Comparative Trial Balances")
+    jel_sheet = workbook.create_sheet("Journal Entries & Lines")
+    mapping_sheet = workbook.create_sheet("Mapping Categories")
+
+    # Journal lines come first so the trial balance can roll forward from their activity.
+    jel_rows = [JEL_HEADER, JEL_DESCRIPTION]
+    journal = 0
+    while len(jel_rows) - 2 < journal_lines:
+        journal += 1
+        journal_id = f"JE-{journal:08d}"
+        date = start + datetime.timedelta(days=rng.randrange(365))
+        line_count = min(rng.randint(2, 6), journal_lines - (len(jel_rows) - 2))
+        # Amounts are signed cents: debits positive, credits negative, netting to zero.
+        amounts = [rng.randint(100, 5_000_000) * rng.choice([-1, 1]) for _ in range(line_count - 1)]
+        amounts.append(-sum(amounts))
+        if rng.random() < unbalanced_rate:
+            amounts[-1] += rng.choice([-1, 1]) * rng.randint(1, 99)
+        for amount in amounts:
+            account_id = rng.choice(account_ids)
+            activity[account_id] += amount
+            debit = amount / 100 if amount > 0 else None
+            credit = -amount / 100 if amount < 0 else None
+            jel_rows.append([journal_id, "Synthetic entry", date, account_id, "Synthetic line", debit, credit])
+
+    prior = [rng.randint(-10_000_000, 10_000_000) for _ in account_ids]
+    prior[-1] -= sum(prior)
+    ctb_sheet.append(CTB_HEADER)
+    ctb_sheet.append(CTB_DESCRIPTION)
+    for index, account_id in enumerate(account_ids):
+        account_type = ACCOUNT_TYPES[index % len(ACCOUNT_TYPES)]
+        mapping = rng.choice(mapping_values(account_type))
+        if rng.random() < invalid_mapping_rate:
+            if rng.random() < 0.5:
+                account_type = "Unmapped"
+            else:
+                mapping = "Unmapped"
+        current = prior[index] + activity[account_id]
+        ctb_sheet.append([
+            account_id, f"Account {account_id}", prior[index] / 100, current / 100,
+            account_type, mapping, None,
+        ])
+
+    for row in jel_rows:
+        jel_sheet.append(row)
+
+    mapping_sheet.append(["Account Type"] + ACCOUNT_TYPES)
+    for index in range(MAPPINGS_PER_TYPE):
+        account_type = ACCOUNT_TYPES[index] if index < len(ACCOUNT_TYPES) else None
+        mapping_sheet.append([account_type] + [mapping_values(name)[index] for name in ACCOUNT_TYPES])
+
+    workbook.save(path)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic Audit Sight template.")
+    parser.add_argument("path", help="where to write the .xlsx template")
+    parser.add_argument("--journal-lines", type=int, default=10_000)
+    parser.add_argument("--accounts", type=int, default=500)
+    parser.add_argument("--unbalanced-rate", type=float, default=0.01)
+    parser.add_argument("--invalid-mapping-rate", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    generate_template(
+        args.path,
+        journal_lines=args.journal_lines,
+        accounts=args.accounts,
+        unbalanced_rate=args.unbalanced_rate,
+        invalid_mapping_rate=args.invalid_mapping_rate,
+        seed=args.seed,
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Time each stage of a validation run on synthetic templates and compare against a baseline.
+
+    python benchmarks/run_benchmarks.py --sizes 10000 100000 1000000
+    python benchmarks/run_benchmarks.py --save-baseline
+    python benchmarks/run_benchmarks.py --compare
+    python benchmarks/run_benchmarks.py --reader openpyxl
+
+Every template size runs in a fresh process, so the peak RSS recorded after each stage is the
+high-water mark of that size's run up to and including the stage.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audit_validator.profiling import peak_rss_mb  # noqa: E402
+from generate_template import generate_template  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+def format_mb(megabytes):
+    """Peak memory for printing; peak_rss_mb is None where the platform cannot measure it."""
+    return "n/a" if megabytes is None else f"{megabytes:.0f} MB"
+
+def template_path(work_dir, journal_lines, accounts, unbalanced_rate, invalid_mapping_rate):
+    name = f"template-{journal_lines}-{accounts}-{unbalanced_rate}-{invalid_mapping_rate}.xlsx"
+    return os.path.join(work_dir, name)
+
+def run_stages(input_path, output_dir, reader=None):
+    """Run the validation pipeline stage by stage, returning {stage: {seconds, peak_rss_mb}}."""
+    from audit_validator.backends import XLSX_BACKENDS, xlsx_backend
+    from audit_validator.checks import (
+        check_balance_sums,
+        check_debit_credit_sums,
+        check_journal_entry_balances,
+        process_journal_entries,
+        validate_comparative_trial_balances,
+    )
+    from audit_validator.context import SHEET_LAYOUTS, ValidationContext
+    from audit_validator.duplicates import check_duplicate_lines
+    from audit_validator.reconciliation import check_account_id_in_ctb, check_roll_forward
+    from audit_validator.schema import compact_frame
+
+    stages = {}
+
+    def timed(stage, func, *args):
+        start = time.perf_counter()
+        value = func(*args)
+        stages[stage] = {"seconds": time.perf_counter() - start, "peak_rss_mb": peak_rss_mb()}
+        return value
+
+    frames = {}
+    backend = xlsx_backend(reader)
+    with XLSX_BACKENDS[backend](input_path) as sheet_rows:
+        for sheet_name, layout in SHEET_LAYOUTS.items():
+            frames[sheet_name] = timed(
+                f"read_{backend}[{sheet_name}]", lambda: compact_frame(layout(sheet_rows(sheet_name)), sheet_name),
+            )
+
+    output_path = os.path.join(output_dir, "output_file.xlsx")
+    context = ValidationContext(input_path, output_path, output_dir, frames=frames)
+    timed("process_journal_entries", process_journal_entries, context.df_jel)
+    timed("validate_comparative_trial_balances", validate_comparative_trial_balances, context)
+    timed("check_balance_sums", check_balance_sums, context.df_ctb)
+    timed("check_debit_credit_sums", check_debit_credit_sums, context.df_jel)
+    timed("check_journal_entry_balances", check_journal_entry_balances, context.df_jel, output_dir)
+    timed("check_duplicate_lines", check_duplicate_lines, context)
+    timed("check_roll_forward", check_roll_forward, context)
+    timed("check_account_id_in_ctb", check_account_id_in_ctb, context)
+    timed("write_excel", context.save)
+    return stages
+
+def benchmark_size(input_path, reader=None):
+    with tempfile.TemporaryDirectory() as output_dir:
+        start = time.perf_counter()
+        stages = run_stages(input_path, output_dir, reader)
+        total = time.perf_counter() - start
+    return {"total_seconds": total, "peak_rss_mb": peak_rss_mb(), "stages": stages}
+
+def run(sizes, accounts, unbalanced_rate, invalid_mapping_rate, work_dir, reader=None):
+    results = {}
+    spawn = multiprocessing.get_context("spawn")
+    for journal_lines in sizes:
+        path = template_path(work_dir, journal_lines, accounts, unbalanced_rate, invalid_mapping_rate)
+        if not os.path.exists(path):
+            print(f"Generating {journal_lines:,} journal lines -> {path}", flush=True)
+            generate_template(
+                path,
+                journal_lines=journal_lines,
+                accounts=accounts,
+                unbalanced_rate=unbalanced_rate,
+                invalid_mapping_rate=invalid_mapping_rate,
+            )
+        with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as executor:
+            results[str(journal_lines)] = executor.submit(benchmark_size, path, reader).result()
+        print_size(journal_lines, results[str(journal_lines)])
+    return results
+
+def print_size(journal_lines, result):
+    print(f"\n{journal_lines:,} journal lines: {result['total_seconds']:.2f}s, peak RSS {format_mb(result['peak_rss_mb'])}")
+    for stage, timing in result["stages"].items():
+        print(f"  {stage:<50} {timing['seconds']:>9.3f}s {format_mb(timing['peak_rss_mb']):>11}")
+
+def compare(results, baseline, tolerance):
+    """Print stages slower than the baseline by more than tolerance and return how many there were."""
+    regressions = 0
+    for size, result in results.items():
+        if size not in baseline:
+            continue
+        expected_stages = baseline[size]["stages"]
+        for stage, timing in result["stages"].items():
+            expected = expected_stages.get(stage)
+            # Stages this quick are dominated by timer noise.
+            if expected is None or expected["seconds"] < 0.05:
+                continue
+            ratio = timing["seconds"] / expected["seconds"]
+            if ratio > 1 + tolerance:
+                regressions += 1
+                print(
+                    f"REGRESSION {size} lines, {stage}: {timing['seconds']:.3f}s "
+                    f"vs baseline {expected['seconds']:.3f}s ({ratio:.2f}x)"
+                )
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the validation stages on synthetic templates.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000], help="journal line counts")
+    parser.add_argument("--accounts", type=int, default=2_000)
+    parser.add_argument("--unbalanced-rate", type=float, default=0.01)
+    parser.add_argument("--invalid-mapping-rate", type=float, default=0.02)
+    parser.add_argument("--work-dir", default=os.path.join(tempfile.gettempdir(), "audit-validator-benchmarks"),
+                        help="where generated templates are kept between runs")
+    parser.add_argument("--reader", choices=["auto", "openpyxl", "calamine"], default="auto",
+                        help="xlsx reader backend (default: calamine when installed)")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--compare", action="store_true", help="fail when a stage is slower than the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before a stage regresses")
+    args = parser.parse_args(argv)
+    if args.compare and not args.save_baseline and not os.path.exists(args.baseline):
+        parser.error(f"no baseline at {args.baseline}; run with --save-baseline first")
+
+    os.makedirs(args.work_dir, exist_ok=True)
+    results = run(args.sizes, args.accounts, args.unbalanced_rate, args.invalid_mapping_rate, args.work_dir,
+                  args.reader)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+    if args.compare:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        print(f"\n{regressions} regression(s) against {args.baseline}")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,36 @@
+import sys
+
 from setuptools import setup
 
 APP = ['excel_parser.py']  # Replace 'main.py' with the name of your script
 DATA_FILES = []
 OPTIONS = {
     'argv_emulation': True,
-    'packages': ['pandas', 'openpyxl'],
+    'packages': ['pandas', 'openpyxl', 'audit_validator'],
     'includes': ['tkinter'],  # Use tkinter for file dialog if needed
     'excludes': ['PyInstaller', 'gi', 'gi.repository'],
 }
 
 setup(
+    name='audit-validator',
     app=APP,
     data_files=DATA_FILES,
+    packages=['audit_validator'],
+    py_modules=['excel_parser'],
+    install_requires=['numpy', 'openpyxl', 'pandas'],
+    extras_require={
+        # calamine reads xlsx templates several times faster than openpyxl.
+        'fast': ['python-calamine'],
+        # Parquet and Feather tab files.
+        'arrow': ['pyarrow'],
+    },
+    entry_points={
+        'console_scripts': [
+            'audit-validate=audit_validator.cli:main',
+            'audit-validate-service=audit_validator.service:main',
+        ],
+    },
     options={'py2app': OPTIONS},
-    setup_requires=['py2app'],
+    # py2app only exists on macOS; plain installs of the CLI must not require it.
+    setup_requires=['py2app'] if 'py2app' in sys.argv else [],
 )